@@ -2,75 +2,219 @@
 
 from shared.types import HealthBotState
 from langchain_core.messages import HumanMessage, SystemMessage
-from twilio.rest import Client
 from dotenv import load_dotenv
-import os
-from db.postgres_adapter import get_symptom_frequencies
-from datetime import datetime
-from langchain_community.chat_models import ChatOpenAI
+from db.postgres_adapter import (
+    get_symptom_frequency_windows,
+    aget_symptom_frequency_windows,
+    enqueue_alert,
+    aenqueue_alert,
+    ALERT_DEDUP_WINDOW_MINUTES,
+)
+from shared.llm_provider import get_llm
+from shared.metrics import ALERTS, EMERGENCY_TRIAGE
+from agents.red_flag_triage import triage, EMERGENCY, REVIEW
+from workers import alert_dispatcher
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",  
-    openai_api_key=os.environ["OPENROUTER_API_KEY"],
-    openai_api_base="https://openrouter.ai/api/v1"
+SYSTEM_MSG = (
+    "You are a medical emergency classifier. Respond ONLY with 'EMERGENCY' "
+    "if the message suggests any serious or urgent condition like chest pain, unconsciousness, bleeding, etc. Else say 'SAFE'."
 )
 
-twilio_client = Client(
-    os.getenv("TWILIO_ACCOUNT_SID"),
-    os.getenv("TWILIO_AUTH_TOKEN")
-)
-twilio_from = os.getenv("TWILIO_WHATSAPP_FROM")
-emergency_to = os.getenv("EMERGENCY_CONTACT")
 
-def emergency_alert_agent(state: HealthBotState) -> HealthBotState:
-    symptoms = state.get("symptoms", [])
-    user_prompt = state["messages"][-1].content
-    emergency_detected = False
-    freq_map = get_symptom_frequencies(state["user_id"], symptoms, days=30)
+def _apply_frequency_risk(state: HealthBotState, freq_map: dict) -> list:
     freq_risk_symptoms = [s for s, count in freq_map.items() if count >= 3]
 
     if freq_risk_symptoms:
-        emergency_detected = True
         prev_score = state.get("risk_score")
         prev_score = prev_score if isinstance(prev_score, (int, float)) else 0.0
         state["risk_score"] = max(prev_score, 0.9)
 
         state["emergency_flags"] = [f"Frequent symptom: {', '.join(freq_risk_symptoms)}"]
 
-    system_msg = (
-        "You are a medical emergency classifier. Respond ONLY with 'EMERGENCY' "
-        "if the message suggests any serious or urgent condition like chest pain, unconsciousness, bleeding, etc. Else say 'SAFE'."
+    return freq_risk_symptoms
+
+
+def _llm_verdict(content: str) -> str:
+    llm_decision = content.strip().lower()
+    return "EMERGENCY" if "emergency" in llm_decision else "SAFE"
+
+
+# Alerts go to the outbox and workers/alert_dispatcher.py sends them, so the
+# chat never waits on Twilio. Returns the flag to record for the user.
+def _queued_flag(queued: bool) -> str:
+    if queued:
+        ALERTS.inc("queued")
+        alert_dispatcher.notify()
+        return " WhatsApp alert queued."
+    ALERTS.inc("deduplicated")
+    return f" Alert already sent in the last {ALERT_DEDUP_WINDOW_MINUTES} min."
+
+
+# (alert_sent, flag to record)
+def _queue_alert(user_id: str, kind: str, body: str) -> tuple:
+    try:
+        return True, _queued_flag(enqueue_alert(user_id, kind, body))
+    except Exception as e:
+        return False, f"Alert failed: {e}"
+
+
+async def _aqueue_alert(user_id: str, kind: str, body: str) -> tuple:
+    try:
+        return True, _queued_flag(await aenqueue_alert(user_id, kind, body))
+    except Exception as e:
+        return False, f"Alert failed: {e}"
+
+
+def _record_alert(target: dict, outcome: tuple) -> dict:
+    sent, flag = outcome
+    target["alert_sent"] = sent
+    target.setdefault("emergency_flags", []).append(flag)
+    return target
+
+
+def _alert_kind(state: HealthBotState) -> str:
+    verdict = state.get("_emergency_verdict")
+    if verdict == EMERGENCY:
+        return "emergency"
+    return "review" if verdict == REVIEW else "frequency"
+
+
+def _red_flag_update(red_flags: list) -> dict:
+    return {
+        "_emergency_verdict": EMERGENCY,
+        "emergency_flags": [f"Red flag: {', '.join(red_flags)}"],
+    }
+
+
+def _red_flag_message(state: HealthBotState, red_flags: list) -> str:
+    return (
+        f"Emergency Alert for user {state['user_id']}:\n"
+        f"User says: \"{state['messages'][-1].content}\"\n"
+        f"Red flags: {', '.join(red_flags)}"
     )
-    llm_response = llm.invoke([
-        SystemMessage(content=system_msg),
-        HumanMessage(content=user_prompt)
+
+
+# Red-flag rules: (update, alert body). The update is None when the LLM has to
+# decide; a body means clear red flags, whose alert is queued right here
+# instead of waiting for the join.
+def _rule_verdict(state: HealthBotState) -> tuple:
+    verdict, red_flags = triage(state["messages"][-1].content)
+    EMERGENCY_TRIAGE.inc(verdict.lower() if verdict else "llm")
+
+    if verdict == EMERGENCY:
+        return _red_flag_update(red_flags), _red_flag_message(state, red_flags)
+    if verdict:
+        return {"_emergency_verdict": verdict}, None
+    return None, None
+
+
+def rule_verdict_update(state: HealthBotState):
+    update, body = _rule_verdict(state)
+    if body:
+        _record_alert(update, _queue_alert(state["user_id"], "emergency", body))
+    return update
+
+
+async def arule_verdict_update(state: HealthBotState):
+    update, body = _rule_verdict(state)
+    if body:
+        _record_alert(update, await _aqueue_alert(state["user_id"], "emergency", body))
+    return update
+
+
+def llm_verdict_update(state: HealthBotState) -> dict:
+    llm_response = get_llm().invoke([
+        SystemMessage(content=SYSTEM_MSG),
+        HumanMessage(content=state["messages"][-1].content)
+    ])
+    return {"_emergency_verdict": _llm_verdict(llm_response.content), "_emergency_source": "llm"}
+
+
+async def allm_verdict_update(state: HealthBotState) -> dict:
+    llm_response = await get_llm().ainvoke([
+        SystemMessage(content=SYSTEM_MSG),
+        HumanMessage(content=state["messages"][-1].content)
     ])
-    llm_decision = llm_response.content.strip().lower()
-    if "emergency" in llm_decision:
-        emergency_detected = True
-        state.setdefault("emergency_flags", []).append("Emergency detected by AI")
-
-    if emergency_detected:
-        try:
-            alert_msg = (
-                f"Emergency Alert for user {state['user_id']}:\n"
-                f"User says: \"{user_prompt}\"\n"
-                f"Symptoms: {', '.join(symptoms)}\n"
-                f"Frequent Symptoms: {', '.join(freq_risk_symptoms)}"
-            )
-            twilio_client.messages.create(
-                from_=twilio_from,
-                to=emergency_to,
-                body=alert_msg
-            )
-            state["alert_sent"] = True
-            state["emergency_flags"].append(" WhatsApp message sent.")
-        except Exception as e:
-            state["alert_sent"] = False
-            state["emergency_flags"].append(f"Alert failed: {e}")
+    return {"_emergency_verdict": _llm_verdict(llm_response.content), "_emergency_source": "llm"}
+
+
+# Only needs the raw message, so it fans out alongside symptom extraction.
+# Clearly benign messages never reach the LLM.
+def emergency_classifier_agent(state: HealthBotState) -> dict:
+    update = rule_verdict_update(state)
+    return update if update is not None else llm_verdict_update(state)
+
+
+async def aemergency_classifier_agent(state: HealthBotState) -> dict:
+    update = await arule_verdict_update(state)
+    return update if update is not None else await allm_verdict_update(state)
+
+
+# Fallback for the pre-routing nodes when they're dropped (timeout, deadline,
+# open circuit). Fails safe: the rules still settle clear cases, and anything
+# they can't is flagged for review instead of being treated as SAFE.
+def emergency_fallback(state: HealthBotState, name: str) -> dict:
+    verdict, red_flags = triage(state["messages"][-1].content)
+    if verdict == EMERGENCY:
+        update = _red_flag_update(red_flags)   # emergency_alert queues it
+    elif verdict:
+        update = {"_emergency_verdict": verdict}
     else:
+        update = {
+            "_emergency_verdict": REVIEW,
+            "_emergency_source": "fallback",
+            "emergency_flags": [f"Emergency check unavailable ({name} dropped), flagged for review"],
+        }
+    update["skipped_nodes"] = [name]
+    return update
+
+
+def _apply_verdict(state: HealthBotState, freq_risk_symptoms: list) -> bool:
+    if state.get("_emergency_verdict") == "EMERGENCY":
+        if state.get("_emergency_source") == "llm":
+            state.setdefault("emergency_flags", []).append("Emergency detected by AI")
+        return True
+    return state.get("_emergency_verdict") == REVIEW or bool(freq_risk_symptoms)
+
+
+def _alert_message(state: HealthBotState, user_prompt: str, freq_risk_symptoms: list) -> str:
+    title = "Please review" if state.get("_emergency_verdict") == REVIEW else "Emergency Alert"
+    return (
+        f"{title} for user {state['user_id']}:\n"
+        f"User says: \"{user_prompt}\"\n"
+        f"Symptoms: {', '.join(state.get('symptoms', []))}\n"
+        f"Frequent Symptoms: {', '.join(freq_risk_symptoms)}"
+    )
+
+
+# Records the frequency risk and verdict on state; returns (kind, body) of the
+# alert to queue, or None
+def _pending_alert(state: HealthBotState, frequencies: dict):
+    # both windows in one query; handle_db reuses the 7-day counts
+    state["_symptom_frequencies"] = frequencies
+    freq_risk_symptoms = _apply_frequency_risk(state, frequencies[30])
+    emergency_detected = _apply_verdict(state, freq_risk_symptoms)
+
+    if state.get("alert_sent"):
+        return None  # red-flag alert already queued by the classifier
+    if not emergency_detected:
         state["alert_sent"] = False
+        return None
+    return _alert_kind(state), _alert_message(state, state["messages"][-1].content, freq_risk_symptoms)
+
+
+# Runs after the pre-routing join: combines the classifier verdict with symptom history
+def emergency_alert_agent(state: HealthBotState) -> HealthBotState:
+    alert = _pending_alert(state, get_symptom_frequency_windows(state["user_id"], state.get("symptoms", [])))
+    if alert:
+        _record_alert(state, _queue_alert(state["user_id"], *alert))
+    return state
+
 
-    return state
\ No newline at end of file
+async def aemergency_alert_agent(state: HealthBotState) -> HealthBotState:
+    alert = _pending_alert(state, await aget_symptom_frequency_windows(state["user_id"], state.get("symptoms", [])))
+    if alert:
+        _record_alert(state, await _aqueue_alert(state["user_id"], *alert))
+    return state
@@ -2,30 +2,66 @@ from langchain_core.messages import HumanMessage
 from shared.types import HealthBotState
 from dotenv import load_dotenv
 import os
-from langchain_community.chat_models import ChatOpenAI
+from shared.llm_provider import get_llm
+from shared.context_packer import Section, dedupe, pack, rank_by_overlap, report
+from shared.metrics import PROMPT_SECTION_TOKENS
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct", 
-    openai_api_key=os.environ["OPENROUTER_API_KEY"],
-    openai_api_base="https://openrouter.ai/api/v1"
-)
-def final_summary_agent(state: HealthBotState) -> HealthBotState:
+# token budget for agent results + memory; the instructions around them are fixed
+FINAL_SUMMARY_CONTEXT_TOKENS = int(os.getenv("FINAL_SUMMARY_CONTEXT_TOKENS", "1500"))
+
+_NOT_CONTEXT = ("memory_context", "final_summary")
+
+
+def _latest_user_query(state: HealthBotState) -> str:
+    user_messages = [m for m in state.get("messages", []) if m.type == "human"]
+    return user_messages[-1].content.strip() if user_messages else ""
+
+
+def _paragraphs(value) -> list:
+    items = value if isinstance(value, (list, tuple)) else str(value).split("\n\n")
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def _context_sections(state: HealthBotState) -> list:
+    current_results = state.get("agent_outputs", {})
+    sections = []
+    for name, value in current_results.items():
+        if name in _NOT_CONTEXT:
+            continue
+        items = dedupe(_paragraphs(value))
+        if name == "info_search":
+            # Tavily snippets, most relevant to the question first
+            items = rank_by_overlap(items, _latest_user_query(state))
+        sections.append(Section(name, items, separator="\n\n"))
+
+    # memory comes oldest first; keep the newest when it has to be cut
+    memory = current_results.get("memory_context") or state.get("memory_context") or []
+    sections.append(Section("memory_context", dedupe(_paragraphs(memory)[::-1])))
+    return sections
+
+
+def _build_summary_prompt(state: HealthBotState) -> str:
     current_results = state.get("agent_outputs", {})
     print("[final_summary_agent] incoming agent_outputs:", current_results.keys())
-    memory = state.memory if hasattr(state, "memory") else []
 
-    
+    packed = pack(_context_sections(state), FINAL_SUMMARY_CONTEXT_TOKENS)
+    for section in packed.values():
+        PROMPT_SECTION_TOKENS.observe(section.tokens, section.name)
+    print(f"[final_summary_agent] context tokens (budget {FINAL_SUMMARY_CONTEXT_TOKENS}):", report(packed))
+
+    memory = packed.pop("memory_context")
     memory_text = "\n".join(
-        f"- {entry.get('inputs', {}).get('message', '')} → {entry.get('results', {})}" 
-        for entry in memory
+        f"- {entry}" for entry in reversed(memory.items)
     ) or "No past history."
 
-    
     current_text = "\n".join(
-        f"- {k}: {v}" for k, v in current_results.items()
+        f"- {name}: {section.text}" for name, section in packed.items() if section.items
     ) or "No current results."
+    skipped = state.get("skipped_nodes") or []
+    if skipped:
+        current_text += f"\n- Not available this time (don't guess their results): {', '.join(skipped)}"
 
     print("**Available results before summarizing:", state.get("agent_outputs", {}).keys())
 
@@ -56,8 +92,53 @@ You are a medical assistant in a chatbot powered by a multi-agent system. Your r
 Reply with a point-wise, concise paragraph (120 - 200 words) using headings for each agent, medicines (if applicable), summary, and memory insights.
 """.strip()
 
-    response = llm.invoke([HumanMessage(content=prompt)])
-    state.setdefault("agent_outputs", {})["final_summary"] = response.content.strip()
-    print("**Final summary stored:", response.content.strip()[:300])
+    return prompt
+
+
+def _with_warnings(state: HealthBotState, content: str) -> str:
+    # e.g. handle_db's frequent-symptom warning, always shown as written
+    warnings = state.get("warnings") or []
+    return "\n\n".join([content.strip()] + [w for w in warnings if w not in content])
+
+
+def _store_summary(state: HealthBotState, content: str) -> HealthBotState:
+    content = _with_warnings(state, content)
+    state.setdefault("agent_outputs", {})["final_summary"] = content.strip()
+    print("**Final summary stored:", content.strip()[:300])
 
     return state
+
+
+# Used when the summary LLM call misses the deadline or its circuit is open
+FALLBACK_HEADINGS = {
+    "home_remedy": "Home Remedies",
+    "physical_relief": "Physical Relief",
+    "info_search": "Info Search",
+    "general_medical": "General Medical",
+}
+FALLBACK_POINTS = 2
+
+
+def fallback_summary(state: HealthBotState, name: str = "final_summary") -> dict:
+    """The top points of each finished agent, without an LLM call."""
+    packed = pack(_context_sections(state), FINAL_SUMMARY_CONTEXT_TOKENS)
+    packed.pop("memory_context")
+    parts = [
+        f"{FALLBACK_HEADINGS.get(section.name, section.name)}:\n"
+        + "\n".join(f"- {item}" for item in section.items[:FALLBACK_POINTS])
+        for section in packed.values() if section.items
+    ] or ["Sorry, I couldn't put an answer together in time. Please try again in a moment."]
+    parts.append("If your symptoms are severe or getting worse, please contact a doctor.")
+    content = _with_warnings(state, "\n\n".join(parts))
+    print("**Fallback summary stored:", content[:300])
+    return {"agent_outputs": {"final_summary": content}, "skipped_nodes": [name]}
+
+
+def final_summary_agent(state: HealthBotState) -> HealthBotState:
+    response = get_llm().invoke([HumanMessage(content=_build_summary_prompt(state))])
+    return _store_summary(state, response.content)
+
+
+async def afinal_summary_agent(state: HealthBotState) -> HealthBotState:
+    response = await get_llm().ainvoke([HumanMessage(content=_build_summary_prompt(state))])
+    return _store_summary(state, response.content)
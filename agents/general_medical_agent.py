@@ -2,33 +2,48 @@ from langchain_core.messages import HumanMessage
 from shared.types import HealthBotState
 from dotenv import load_dotenv
 import os
-from langchain_community.chat_models import ChatOpenAI
+from shared.llm_provider import get_llm
+from shared.llm_cache import cached_response, acached_response, prompt_key
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",  # or any OpenRouter model
-    openai_api_key=os.environ["OPENROUTER_API_KEY"],
-    openai_api_base="https://openrouter.ai/api/v1"
-)
-def general_medical_agent(state: HealthBotState) -> HealthBotState:
-    query = state["messages"][-1].content.strip()
-    if not query:
-        
-        outputs = dict(state.get("agent_outputs", {}))
-        outputs["general_medical"] = "**I didn't receive any clear question to respond to."
-        state["agent_outputs"] = outputs
-
-        return state
-
-    prompt = f"""You are a general medical assistant in India.
+def _general_medical_prompt(query: str) -> str:
+    return f"""You are a general medical assistant in India.
 Answer the following user query in a helpful, responsible, and medically informed way. 
 Keep the language simple.
 User: {query}
 """
-    response = llm.invoke([HumanMessage(content=prompt)])
+
+
+def _store_answer(state: HealthBotState, answer: str) -> HealthBotState:
     outputs = dict(state.get("agent_outputs", {}))
-    outputs["general_medical"] = response.content.strip()
+    outputs["general_medical"] = answer
     state["agent_outputs"] = outputs
 
     return state
+
+
+def general_medical_agent(state: HealthBotState) -> HealthBotState:
+    query = state["messages"][-1].content.strip()
+    if not query:
+        return _store_answer(state, "**I didn't receive any clear question to respond to.")
+
+    answer = cached_response(
+        "general_medical",
+        prompt_key(query),
+        lambda: get_llm().invoke([HumanMessage(content=_general_medical_prompt(query))]).content.strip()
+    )
+    return _store_answer(state, answer)
+
+
+async def ageneral_medical_agent(state: HealthBotState) -> HealthBotState:
+    query = state["messages"][-1].content.strip()
+    if not query:
+        return _store_answer(state, "**I didn't receive any clear question to respond to.")
+
+    async def ask_llm():
+        response = await get_llm().ainvoke([HumanMessage(content=_general_medical_prompt(query))])
+        return response.content.strip()
+
+    answer = await acached_response("general_medical", prompt_key(query), ask_llm)
+    return _store_answer(state, answer)
@@ -6,37 +6,32 @@ from dotenv import load_dotenv
 from db.postgres_adapter import log_symptom_interaction
 from datetime import datetime
 import os
-from langchain_community.chat_models import ChatOpenAI
+from shared.llm_provider import get_llm
+from shared.llm_cache import cached_response, acached_response, symptoms_key
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct", 
-    openai_api_key=os.environ["OPENROUTER_API_KEY"],
-    openai_api_base="https://openrouter.ai/api/v1"
+
+REMEDY_SYSTEM_PROMPT = (
+    "You are a cautious medical assistant. Your task is to:\n"
+    "1. Identify 1–2 suspected Disease(s) based on the user's symptoms.\n"
+    "2. Provide a remedies per major symptom.\n"
+    "3. Format exactly as:\n"
+    "Suspected Disease(s):\n- Disease1\n- Disease2\n\n"
+    "Remedies:\n1. Remedy1\n2. Remedy2\n3. Remedy3\n\n"
 )
 
-def home_remedy_agent(state: HealthBotState) -> HealthBotState:
-    symptoms = state.get("symptoms", [])
-    response_lines = []
-
-    # Remedy home
-    remedy_system_prompt = (
-        "You are a cautious medical assistant. Your task is to:\n"
-        "1. Identify 1–2 suspected Disease(s) based on the user's symptoms.\n"
-        "2. Provide a remedies per major symptom.\n"
-        "3. Format exactly as:\n"
-        "Suspected Disease(s):\n- Disease1\n- Disease2\n\n"
-        "Remedies:\n1. Remedy1\n2. Remedy2\n3. Remedy3\n\n"
-    )
-    remedy_response = llm.invoke([
-        SystemMessage(content=remedy_system_prompt),
+
+def _remedy_messages(symptoms: list) -> list:
+    return [
+        SystemMessage(content=REMEDY_SYSTEM_PROMPT),
         HumanMessage(content=f"Symptoms: {', '.join(symptoms)}")
-    ])
-    remedies_text = remedy_response.content.strip()
-    response_lines.append(remedies_text)
+    ]
+
+
+def _apply_remedies(state: HealthBotState, remedies_text: str) -> HealthBotState:
+    response_lines = [remedies_text]
 
-    
     suspected_diseases = []
     lines = remedies_text.splitlines()
     in_disease_section = False
@@ -63,3 +58,24 @@ def home_remedy_agent(state: HealthBotState) -> HealthBotState:
 
     #log_symptom_interaction(state)
     return state
+
+
+def home_remedy_agent(state: HealthBotState) -> HealthBotState:
+    symptoms = state.get("symptoms", [])
+    remedies_text = cached_response(
+        "home_remedy",
+        symptoms_key(symptoms),
+        lambda: get_llm().invoke(_remedy_messages(symptoms)).content.strip()
+    )
+    return _apply_remedies(state, remedies_text)
+
+
+async def ahome_remedy_agent(state: HealthBotState) -> HealthBotState:
+    symptoms = state.get("symptoms", [])
+
+    async def ask_llm():
+        remedy_response = await get_llm().ainvoke(_remedy_messages(symptoms))
+        return remedy_response.content.strip()
+
+    remedies_text = await acached_response("home_remedy", symptoms_key(symptoms), ask_llm)
+    return _apply_remedies(state, remedies_text)
@@ -1,20 +1,19 @@
 from langgraph.graph import StateGraph, END, add_messages
-from langchain_tavily import TavilySearch
 from shared.types import HealthBotState
 from typing import TypedDict, Annotated
 from dotenv import load_dotenv
 import os
+import threading
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_community.chat_models import ChatOpenAI
+from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+from shared.llm_provider import get_llm
+from shared.llm_cache import cached_response, acached_response, prompt_key
+from shared.cache import TTLCache, normalize_text
+from shared.metrics import CACHE_REQUESTS, track_call
+from shared.resilience import CircuitOpenError, tavily_breaker
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct", 
-    openai_api_key=os.environ["OPENROUTER_API_KEY"],
-    openai_api_base="https://openrouter.ai/api/v1"
-)
 
 
 
@@ -22,9 +21,28 @@ search_prompt = PromptTemplate.from_template(
     "You are an expert medical assistant. Rewrite this user query to make it ideal for an accurate online search: {query}"
 )
 
-query_rewriter = search_prompt | llm | (lambda x: x.content.strip())
+def query_rewriter():
+    return search_prompt | get_llm() | (lambda x: x.content.strip())
+
+# Built on first search, not at import (benchmarks swap in a fake by setting search_tool)
+search_tool = None
+_search_tool_lock = threading.Lock()
+
+
+def get_search_tool():
+    global search_tool
+    with _search_tool_lock:
+        if search_tool is None:
+            from langchain_tavily import TavilySearch
+            search_tool = TavilySearch(k=2, tavily_api_key=os.getenv("TAVILY_API_KEY"))
+    return search_tool
 
-search_tool = TavilySearch(k=2, tavily_api_key=os.getenv("TAVILY_API_KEY"))
+# Tavily results keyed on (rewritten query, location); only the trimmed result list is kept
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "86400"))
+SEARCH_CACHE_MAXSIZE = int(os.getenv("SEARCH_CACHE_MAXSIZE", "512"))
+SEARCH_RESULT_FIELDS = ("title", "url", "content")
+
+search_cache = TTLCache(maxsize=SEARCH_CACHE_MAXSIZE, ttl=SEARCH_CACHE_TTL)
 
 
 class InfoState(TypedDict):
@@ -35,9 +53,24 @@ class InfoState(TypedDict):
     _search_results: list
 
 
-def search_topic_node(state: HealthBotState) -> HealthBotState:
+def _latest_user_query(state: HealthBotState) -> str:
     user_messages = [m for m in state["messages"] if m.type == "human"]
-    user_query = user_messages[-1].content.strip() if user_messages else ""
+    return user_messages[-1].content.strip() if user_messages else ""
+
+
+def _localize_query(rewritten: str, user_location: str) -> str:
+    # appends location if not present
+    rewritten = rewritten.strip().strip('"').strip("'")
+    query_lower = rewritten.lower()
+    if ("near me" in query_lower or "nearby" in query_lower) and user_location:
+        return f"{rewritten.replace('near me', '').replace('nearby', '')} in {user_location}"
+    elif user_location and user_location.lower() not in query_lower:
+        return f"{rewritten}, {user_location}"
+    return rewritten
+
+
+def search_topic_node(state: HealthBotState) -> HealthBotState:
+    user_query = _latest_user_query(state)
     user_location = state.get("location", "").strip()
 
     if not user_query:
@@ -46,20 +79,44 @@ def search_topic_node(state: HealthBotState) -> HealthBotState:
 
     try:
         # query with striping
-        rewritten = query_rewriter.invoke({"query": user_query})
-        rewritten = rewritten.strip().strip('"').strip("'")
-
-        # appends location if not present
-        query_lower = rewritten.lower()
-        if ("near me" in query_lower or "nearby" in query_lower) and user_location:
-            improved_query = f"{rewritten.replace('near me', '').replace('nearby', '')} in {user_location}"
-        elif user_location and user_location.lower() not in query_lower:
-            improved_query = f"{rewritten}, {user_location}"
-        else:
-            improved_query = rewritten
+        rewritten = cached_response(
+            "query_rewriter",
+            prompt_key(user_query),
+            lambda: query_rewriter().invoke({"query": user_query})
+        )
+        improved_query = _localize_query(rewritten, user_location)
+
+        print(f"&& Final query to search: {improved_query}")
+        state["_search_topic"] = improved_query
+    except CircuitOpenError:
+        raise   # bounded_node drops the branch
+    except Exception as e:
+        print(f"&& Query rewriting failed: {e}")
+        state["_search_topic"] = user_query
+
+    return state
+
+
+async def asearch_topic_node(state: HealthBotState) -> HealthBotState:
+    user_query = _latest_user_query(state)
+    user_location = state.get("location", "").strip()
+
+    if not user_query:
+        state["_search_topic"] = None
+        return state
+
+    try:
+        rewritten = await acached_response(
+            "query_rewriter",
+            prompt_key(user_query),
+            lambda: query_rewriter().ainvoke({"query": user_query})
+        )
+        improved_query = _localize_query(rewritten, user_location)
 
         print(f"&& Final query to search: {improved_query}")
         state["_search_topic"] = improved_query
+    except CircuitOpenError:
+        raise   # bounded_node drops the branch
     except Exception as e:
         print(f"&& Query rewriting failed: {e}")
         state["_search_topic"] = user_query
@@ -70,20 +127,78 @@ def search_topic_node(state: HealthBotState) -> HealthBotState:
 
 # tavily search
 
+def _search_cache_key(state: HealthBotState, topic: str) -> tuple:
+    return normalize_text(topic), normalize_text(state.get("location", ""))
+
+
+def _raise_tool_error(result):
+    # TavilySearch returns request failures as {"error": exc} instead of raising
+    if isinstance(result, dict) and isinstance(result.get("error"), Exception):
+        raise result["error"]
+    return result
+
+
+def _trim_results(result) -> list:
+    if isinstance(result, dict) and "results" in result:
+        trimmed = [
+            {k: r[k] for k in SEARCH_RESULT_FIELDS if k in r}
+            for r in result["results"] if isinstance(r, dict)
+        ]
+        print(f"### Tavily returned {len(trimmed)} results")
+        return trimmed
+    return [result]  # Fallback 
+
+
 def search_node(state: HealthBotState) -> HealthBotState:
     topic = state.get("_search_topic")
     print(f"### Entered info_search search_node with topic: {topic}")
     if not topic:
         return state
 
+    key = _search_cache_key(state, topic)
+    cached = search_cache.get(key)
+    CACHE_REQUESTS.inc("search", "info_search", "hit" if cached is not None else "miss")
+    if cached is not None:
+        state["_search_results"] = cached
+        return state
+
+    try:
+        with tavily_breaker.guard(), track_call("tavily"):
+            result = _raise_tool_error(get_search_tool().invoke(topic))
+        results = _trim_results(result)
+        if results and isinstance(results[0], dict):
+            search_cache.set(key, results)
+        state["_search_results"] = results
+    except CircuitOpenError:
+        raise   # bounded_node drops the branch; don't summarize an error as a result
+    except Exception as e:
+        state["_search_results"] = [{"title": "Search Error", "content": str(e)}]
+
+    return state
+
+
+async def asearch_node(state: HealthBotState) -> HealthBotState:
+    topic = state.get("_search_topic")
+    print(f"### Entered info_search search_node with topic: {topic}")
+    if not topic:
+        return state
+
+    key = _search_cache_key(state, topic)
+    cached = search_cache.get(key)
+    CACHE_REQUESTS.inc("search", "info_search", "hit" if cached is not None else "miss")
+    if cached is not None:
+        state["_search_results"] = cached
+        return state
+
     try:
-        result = search_tool.invoke(topic)
-        print("### Tavily raw result:", result)
-        
-        if isinstance(result, dict) and "results" in result:
-            state["_search_results"] = result["results"]
-        else:
-            state["_search_results"] = [result]  # Fallback 
+        with tavily_breaker.guard(), track_call("tavily"):
+            result = _raise_tool_error(await get_search_tool().ainvoke(topic))
+        results = _trim_results(result)
+        if results and isinstance(results[0], dict):
+            search_cache.set(key, results)
+        state["_search_results"] = results
+    except CircuitOpenError:
+        raise   # bounded_node drops the branch; don't summarize an error as a result
     except Exception as e:
         state["_search_results"] = [{"title": "Search Error", "content": str(e)}]
 
@@ -132,14 +247,14 @@ def summarizer_node(state: HealthBotState) -> HealthBotState:
 
 
 #graph
-
-info_graph = StateGraph(HealthBotState)
-info_graph.add_node("search_topic_node", search_topic_node)
-info_graph.add_node("search_node", search_node)
-info_graph.add_node("summarizer_node", summarizer_node)
-info_graph.set_entry_point("search_topic_node")
-info_graph.add_edge("search_topic_node", "search_node")
-info_graph.add_edge("search_node", "summarizer_node")
-info_graph.set_finish_point("summarizer_node")
-
-info_search_agent = info_graph.compile()
+# compiled by build_healthbot_workflow, not at import
+def build_info_search_agent():
+    info_graph = StateGraph(HealthBotState)
+    info_graph.add_node("search_topic_node", RunnableLambda(search_topic_node, afunc=asearch_topic_node))
+    info_graph.add_node("search_node", RunnableLambda(search_node, afunc=asearch_node))
+    info_graph.add_node("summarizer_node", summarizer_node)
+    info_graph.set_entry_point("search_topic_node")
+    info_graph.add_edge("search_topic_node", "search_node")
+    info_graph.add_edge("search_node", "summarizer_node")
+    info_graph.set_finish_point("summarizer_node")
+    return info_graph.compile()
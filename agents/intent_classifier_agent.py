@@ -5,7 +5,10 @@ from langchain_core.messages import HumanMessage
 from langchain_core.messages.ai import AIMessage
 import os
 from dotenv import load_dotenv
-from langchain_community.chat_models import ChatOpenAI
+from shared.llm_provider import get_llm
+from shared.llm_cache import cached_response, acached_response, prompt_key
+from shared.metrics import LOCAL_INTENT
+from agents import local_intent_model
 import re
 
 VALID_INTENTS = {
@@ -22,13 +25,8 @@ def extract_valid_intents(text):
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",  # or any OpenRouter model
-    openai_api_key=os.environ["OPENROUTER_API_KEY"],
-    openai_api_base="https://openrouter.ai/api/v1"
-)
 
-def intent_classifier_agent(state: dict) -> dict:
+def latest_human_message(state: dict) -> str:
     messages = state.get("messages", [])
     last_msg = ""
 
@@ -40,8 +38,11 @@ def intent_classifier_agent(state: dict) -> dict:
         elif isinstance(msg, dict) and msg.get("type") == "human":
             last_msg = msg.get("content", "")
             break
+    return last_msg
+
 
-    prompt = prompt = f"""
+def _intent_prompt(last_msg: str) -> str:
+    prompt = f"""
 You are an intent classifier in a medical chatbot. Your role is to analyze the user's query and classify all applicable intents based on the context and meaning of the text.
 
 Query: "{last_msg}"
@@ -54,19 +55,74 @@ Classify the intent(s) into one or more of the following categories only, no raw
 
 Focus on the semantic meaning of the query rather than specific keywords. If the query contains multiple intents (e.g., symptoms and hospital information), return all relevant labels. If symptoms (e.g., pain, fever, stress) are mentioned, prioritize home_remedy or physical_relief based on context, but also include other applicable intents. Return a comma-separated list of all applicable intent labels (e.g., "home_remedy,info_search"). If only one intent applies, return a single label.
 """.strip()
+    return prompt
+
+
+# Local model first; None means it wasn't confident and the LLM should decide
+def local_intents(last_msg: str):
+    intents = local_intent_model.classify(last_msg)
+    LOCAL_INTENT.inc("hit" if intents else "fallback")
+    if intents:
+        print("**[IntentClassifier] Local model intents:", intents)
+    return intents
+
+
+def intent_classifier_agent(state: dict) -> dict:
+    last_msg = latest_human_message(state)
+    local = local_intents(last_msg)
+    if local:
+        return {"intents": local, "_intent_source": "local"}
+    return llm_intent_update(last_msg)
+
+
+async def aintent_classifier_agent(state: dict) -> dict:
+    last_msg = latest_human_message(state)
+    local = local_intents(last_msg)
+    if local:
+        return {"intents": local, "_intent_source": "local"}
+    return await allm_intent_update(last_msg)
+
+
+def llm_intent_update(last_msg: str) -> dict:
+    prompt = _intent_prompt(last_msg)
 
     try:
-        response = llm.invoke([HumanMessage(content=prompt)])
-        predicted_text = response.content.strip()
+        predicted_text = cached_response(
+            "intent_classifier",
+            prompt_key(last_msg),
+            lambda: get_llm().invoke([HumanMessage(content=prompt)]).content.strip()
+        )
         print("[Intent Classifier] Raw LLM output:", predicted_text)
 
         # Extract only valid intents
-        state["intents"] = extract_valid_intents(predicted_text)
+        intents = extract_valid_intents(predicted_text)
+
+    except Exception as e:
+        print(f"[Intent Classifier Error] {e}")
+        intents = ["fallback"]
+
+    print("**[IntentClassifier] Final intents:", intents)
+    # partial update: runs in parallel with symptom extraction
+    return {"intents": intents, "_intent_source": "llm"}
+
+
+async def allm_intent_update(last_msg: str) -> dict:
+    prompt = _intent_prompt(last_msg)
+
+    async def ask_llm():
+        response = await get_llm().ainvoke([HumanMessage(content=prompt)])
+        return response.content.strip()
+
+    try:
+        predicted_text = await acached_response("intent_classifier", prompt_key(last_msg), ask_llm)
+        print("[Intent Classifier] Raw LLM output:", predicted_text)
+
+        intents = extract_valid_intents(predicted_text)
 
     except Exception as e:
         print(f"[Intent Classifier Error] {e}")
-        state["intents"] = ["fallback"]
+        intents = ["fallback"]
 
-    print("**[IntentClassifier] Final intents:", state.get("intents"))
-    return state
+    print("**[IntentClassifier] Final intents:", intents)
+    return {"intents": intents, "_intent_source": "llm"}
 
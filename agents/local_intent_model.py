@@ -0,0 +1,287 @@
+# agents/local_intent_model.py
+# In-process intent classifier: TF-IDF over words + bigrams and a one-vs-rest
+# logistic regression, pure NumPy. Trained from the intents the LLM assigned in
+# conversation_logs; the intent agent only falls back to the LLM when unsure.
+#
+#   python -m agents.local_intent_model train      # fit on logged LLM labels, report, save
+#   python -m agents.local_intent_model evaluate   # accuracy + latency on logs newer than its training data
+import argparse
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOCAL_INTENT_MODEL_PATH = os.getenv("LOCAL_INTENT_MODEL_PATH", "models/intent_model.npz")
+# answer locally only when every label is at least this sure either way
+LOCAL_INTENT_THRESHOLD = float(os.getenv("LOCAL_INTENT_THRESHOLD", "0.9"))
+LOCAL_INTENT_DISABLED = os.getenv("LOCAL_INTENT_DISABLED", "").lower() in ("1", "true", "yes")
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> list:
+    words = _TOKEN_RE.findall(str(text or "").lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class LocalIntentModel:
+    def __init__(self, vocabulary: dict, idf: np.ndarray, weights: np.ndarray, bias: np.ndarray, labels: list,
+                 trained_through: int = 0):
+        self.vocabulary = vocabulary     # term -> column
+        self.idf = idf                   # (V,)
+        self.weights = weights           # (V, L)
+        self.bias = bias                 # (L,)
+        self.labels = list(labels)
+        self.trained_through = trained_through   # last conversation_logs id in the training data
+
+    # Features
+    @staticmethod
+    def _build_vocabulary(token_lists, max_features: int, min_df: int) -> dict:
+        df = {}
+        for tokens in token_lists:
+            for term in set(tokens):
+                df[term] = df.get(term, 0) + 1
+        terms = sorted((t for t, n in df.items() if n >= min_df), key=lambda t: (-df[t], t))[:max_features]
+        return {term: i for i, term in enumerate(sorted(terms))}
+
+    def _sparse(self, tokens):
+        counts = {}
+        for term in tokens:
+            col = self.vocabulary.get(term)
+            if col is not None:
+                counts[col] = counts.get(col, 0) + 1
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        values = (1.0 + np.log(tf)) * self.idf[cols]
+        return cols, values / np.linalg.norm(values)
+
+    def _matrix(self, texts) -> np.ndarray:
+        X = np.zeros((len(texts), len(self.vocabulary)))
+        for row, text in enumerate(texts):
+            cols, values = self._sparse(tokenize(text))
+            X[row, cols] = values
+        return X
+
+    # Training
+    @classmethod
+    def fit(cls, texts, label_sets, labels, max_features: int = 5000, min_df: int = 1,
+            l2: float = 1e-3, epochs: int = 300, learning_rate: float = 2.0):
+        token_lists = [tokenize(t) for t in texts]
+        vocabulary = cls._build_vocabulary(token_lists, max_features, min_df)
+        df = np.zeros(len(vocabulary))
+        for tokens in token_lists:
+            cols = [vocabulary[t] for t in set(tokens) if t in vocabulary]
+            df[cols] += 1
+        idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+
+        model = cls(vocabulary, idf, np.zeros((len(vocabulary), len(labels))), np.zeros(len(labels)), labels)
+        X = model._matrix(texts)
+        Y = np.array([[label in s for label in labels] for s in label_sets], dtype=np.float64)
+
+        # full-batch gradient descent on the mean logistic loss, all labels at once
+        n = max(len(texts), 1)
+        for _ in range(epochs):
+            P = _sigmoid(X @ model.weights + model.bias)
+            error = P - Y
+            model.weights -= learning_rate * (X.T @ error / n + l2 * model.weights)
+            model.bias -= learning_rate * error.mean(axis=0)
+        return model
+
+    # Inference
+    def predict_proba(self, text: str) -> np.ndarray:
+        cols, values = self._sparse(tokenize(text))
+        return _sigmoid(values @ self.weights[cols] + self.bias)
+
+    def predict(self, text: str):
+        """Return (intents, confidence); confidence is the least certain label's margin."""
+        proba = self.predict_proba(text)
+        intents = [label for label, p in zip(self.labels, proba) if p >= 0.5]
+        confidence = float(np.min(np.maximum(proba, 1.0 - proba))) if len(proba) else 0.0
+        return intents, confidence
+
+    # Persistence
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez_compressed(path, terms=np.array(terms), idf=self.idf, weights=self.weights,
+                            bias=self.bias, labels=np.array(self.labels),
+                            trained_through=np.array(self.trained_through))
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            vocabulary = {str(term): i for i, term in enumerate(data["terms"])}
+            trained_through = int(data["trained_through"]) if "trained_through" in data.files else 0
+            return cls(vocabulary, data["idf"], data["weights"], data["bias"], [str(l) for l in data["labels"]],
+                       trained_through)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+# Process-wide model, loaded on first use
+_model = None
+_model_loaded = False
+_lock = threading.Lock()
+
+
+def get_model():
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _lock:
+            if not _model_loaded:
+                try:
+                    _model = LocalIntentModel.load(LOCAL_INTENT_MODEL_PATH)
+                    print(f"[Local Intent] loaded {LOCAL_INTENT_MODEL_PATH} ({len(_model.vocabulary)} terms)")
+                except FileNotFoundError:
+                    print(f"[Local Intent] no model at {LOCAL_INTENT_MODEL_PATH}; using the LLM only")
+                except Exception as e:
+                    print(f"[Local Intent] could not load {LOCAL_INTENT_MODEL_PATH}: {e}")
+                _model_loaded = True
+    return _model
+
+
+def reload_model():
+    global _model, _model_loaded
+    with _lock:
+        _model, _model_loaded = None, False
+    return get_model()
+
+
+def classify(text: str):
+    """Intents for ``text`` when the local model is confident enough, else None."""
+    if LOCAL_INTENT_DISABLED or not text:
+        return None
+    model = get_model()
+    if model is None:
+        return None
+    intents, confidence = model.predict(text)
+    if intents and confidence >= LOCAL_INTENT_THRESHOLD:
+        return intents
+    return None
+
+
+# Training data and reporting
+def load_labelled_logs(limit: int = None, after_id: int = 0):
+    """Messages, their LLM-assigned intent sets and the newest log id among them."""
+    from db.postgres_adapter import SessionLocal, ConversationLog
+    from agents.intent_classifier_agent import VALID_INTENTS
+
+    session = SessionLocal()
+    try:
+        query = (
+            session.query(ConversationLog.id, ConversationLog.message, ConversationLog.intents)
+            .filter((ConversationLog.intent_source == None) | (ConversationLog.intent_source == "llm"))  # noqa: E711
+            .filter(ConversationLog.id > after_id)
+            .order_by(ConversationLog.id.desc())
+        )
+        if limit:
+            query = query.limit(limit)
+        rows = query.all()
+    finally:
+        session.close()
+
+    texts, label_sets = [], []
+    for _, message, intents in rows:
+        labels = {i.strip() for i in (intents or "").split(",")} & VALID_INTENTS
+        if message and labels:
+            texts.append(message)
+            label_sets.append(labels)
+    return texts, label_sets, max((row[0] for row in rows), default=after_id)
+
+
+def evaluate(model: LocalIntentModel, texts, label_sets, threshold: float = LOCAL_INTENT_THRESHOLD) -> dict:
+    latencies, exact, confident, confident_exact = [], 0, 0, 0
+    for text, expected in zip(texts, label_sets):
+        t0 = time.perf_counter()
+        intents, confidence = model.predict(text)
+        latencies.append(time.perf_counter() - t0)
+        match = set(intents) == set(expected)
+        exact += match
+        if intents and confidence >= threshold:
+            confident += 1
+            confident_exact += match
+    n = len(texts)
+    latencies.sort()
+    return {
+        "samples": n,
+        "exact_match": exact / n if n else 0.0,
+        "coverage": confident / n if n else 0.0,              # share answered without the LLM
+        "confident_accuracy": confident_exact / confident if confident else 0.0,
+        "latency_mean_us": 1e6 * sum(latencies) / n if n else 0.0,
+        "latency_p95_us": 1e6 * latencies[int(0.95 * (n - 1))] if n else 0.0,
+    }
+
+
+def _print_report(title: str, report: dict):
+    print(f"== {title}")
+    print(f"samples              {report['samples']}")
+    print(f"exact match vs LLM   {report['exact_match']:.1%}")
+    print(f"coverage @ {LOCAL_INTENT_THRESHOLD:<9} {report['coverage']:.1%}")
+    print(f"accuracy when local  {report['confident_accuracy']:.1%}")
+    print(f"latency mean / p95   {report['latency_mean_us']:.1f} / {report['latency_p95_us']:.1f} us")
+
+
+def train(holdout: float = 0.2, min_samples: int = 50, limit: int = None, path: str = LOCAL_INTENT_MODEL_PATH):
+    from agents.intent_classifier_agent import VALID_INTENTS
+
+    texts, label_sets, last_id = load_labelled_logs(limit)
+    if len(texts) < min_samples:
+        print(f"[Local Intent] only {len(texts)} labelled conversations, need {min_samples}; not training")
+        return None
+    labels = sorted(VALID_INTENTS)
+
+    order = np.random.default_rng(0).permutation(len(texts))
+    split = int(len(texts) * (1 - holdout))
+    train_idx, test_idx = order[:split], order[split:]
+    if len(test_idx):
+        model = LocalIntentModel.fit([texts[i] for i in train_idx], [label_sets[i] for i in train_idx], labels)
+        _print_report(f"holdout ({len(test_idx)} of {len(texts)})",
+                      evaluate(model, [texts[i] for i in test_idx], [label_sets[i] for i in test_idx]))
+
+    # refit on everything for the saved model
+    model = LocalIntentModel.fit(texts, label_sets, labels)
+    model.trained_through = last_id
+    model.save(path)
+    print(f"[Local Intent] saved {path} ({len(model.vocabulary)} terms, {len(texts)} samples)")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local intent classifier")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_cmd = sub.add_parser("train", help="fit on logged LLM intents and save")
+    train_cmd.add_argument("--holdout", type=float, default=0.2)
+    train_cmd.add_argument("--min-samples", type=int, default=50)
+    train_cmd.add_argument("--limit", type=int, default=None, help="most recent N conversations only")
+    eval_cmd = sub.add_parser("evaluate", help="score the saved model on LLM intents logged after it was trained")
+    eval_cmd.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    from db.postgres_adapter import init_db
+    init_db()
+    if args.command == "train":
+        train(args.holdout, args.min_samples, args.limit)
+    else:
+        model = get_model()
+        if model is None:
+            raise SystemExit(1)
+        # the saved model was refit on every log up to trained_through; score it on newer ones only
+        texts, label_sets, _ = load_labelled_logs(args.limit, after_id=model.trained_through)
+        if not texts:
+            print(f"[Local Intent] no labelled conversations after id {model.trained_through} yet; "
+                  "see the holdout report from `train`")
+            return
+        _print_report(f"saved model, logs after id {model.trained_through}", evaluate(model, texts, label_sets))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,8 @@
 from shared.types import HealthBotState
-from db.postgres_adapter import get_memory_pairs  # New helper function
-
-def memory_reader_agent(state: HealthBotState) -> HealthBotState:
-    user_id = state.get("user_id", "unknown_user")
-
-    # Fetch recent memory pairs from conversation_logs
-    memory_pairs = get_memory_pairs(user_id=user_id, limit=5)  # custom helper
+from db.postgres_adapter import get_memory_pairs, aget_memory_pairs  # New helper function
+from workers.memory_jobs import wait_for_user, wait_for_user_sync
 
+def _store_memory_context(state: HealthBotState, memory_pairs: list) -> HealthBotState:
     # Format memory as readable chunks
     formatted_context = []
     for pair in memory_pairs:
@@ -21,3 +17,21 @@ def memory_reader_agent(state: HealthBotState) -> HealthBotState:
 
     print(f"&&&& [Memory Reader] Loaded {len(formatted_context)} past memories.")
     return state
+
+
+def memory_reader_agent(state: HealthBotState) -> HealthBotState:
+    user_id = state.get("user_id", "unknown_user")
+    # the previous turn's memory may still be in the post-response queue
+    wait_for_user_sync(user_id)
+
+    # Fetch recent memory pairs from conversation_logs
+    memory_pairs = get_memory_pairs(user_id=user_id, limit=5)  # custom helper
+    return _store_memory_context(state, memory_pairs)
+
+
+async def amemory_reader_agent(state: HealthBotState) -> HealthBotState:
+    user_id = state.get("user_id", "unknown_user")
+    # the previous turn's memory may still be in the post-response queue
+    await wait_for_user(user_id)
+    memory_pairs = await aget_memory_pairs(user_id=user_id, limit=5)
+    return _store_memory_context(state, memory_pairs)
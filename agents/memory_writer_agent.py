@@ -1,14 +1,7 @@
-from db.postgres_adapter import store_conversation
 from langchain_core.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
-import os
+from shared.llm_provider import get_llm
 
 
-summarizer_llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",
-    openai_api_key=os.getenv("OPENROUTER_API_KEY"),
-    openai_api_base="https://openrouter.ai/api/v1"
-)
 
 # Short summary 
 summary_prompt = PromptTemplate.from_template(
@@ -16,38 +9,32 @@ summary_prompt = PromptTemplate.from_template(
 )
 
 
-def memory_writer_agent(state: dict) -> dict:
-    user_id = state.get("user_id", "unknown_user")
+def short_summary():
+    return summary_prompt | get_llm() | (lambda x: x.content.strip())
+
 
+def _latest_user_message(state: dict):
     # most recent user message
     user_messages = [m.content for m in state.get("messages", []) if m.type == "human"]
-    if not user_messages:
-        return state
-    latest_user_message = user_messages[-1]
-
-    #  AI response
-    ai_response = state.get("agent_outputs", {}).get("final_summary", "")
-
-    # Summarise the AI response
-    try:
-        short_summary = summary_prompt | summarizer_llm | (lambda x: x.content.strip())
-        compressed_response = short_summary.invoke({"response": ai_response})
-    except Exception as e:
-        print(f"[Summarization Error] Using full response. Error: {e}")
-        compressed_response = ai_response
-
-    # Save to DB
-    entry = {
-        "user_id": user_id,
+    return user_messages[-1] if user_messages else None
+
+
+async def asummarize_response(ai_response: str) -> str:
+    return await short_summary().ainvoke({"response": ai_response})
+
+
+def build_memory_entry(state: dict, compressed_response: str):
+    latest_user_message = _latest_user_message(state)
+    if latest_user_message is None:
+        return None
+    return _memory_entry(state, latest_user_message, compressed_response)
+
+
+def _memory_entry(state: dict, latest_user_message: str, compressed_response: str) -> dict:
+    return {
+        "user_id": state.get("user_id", "unknown_user"),
         "inputs": {"message": latest_user_message},
         "results": {"response": compressed_response},
-        "intents": state.get("intents", [])
+        "intents": state.get("intents", []),
+        "intent_source": state.get("_intent_source"),
     }
-
-    try:
-        store_conversation(entry)
-        print(f"&&& Compressed memory stored for {user_id}")
-    except Exception as e:
-        print(f"[Memory Write Error] {e}")
-
-    return state
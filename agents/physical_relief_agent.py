@@ -24,4 +24,9 @@ def physical_relief_agent(state: HealthBotState) -> HealthBotState:
     outputs["physical_relief"] = message
     state["agent_outputs"] = outputs
 
-    return state
\ No newline at end of file
+    return state
+
+
+async def aphysical_relief_agent(state: HealthBotState) -> HealthBotState:
+    # pure lookup, no I/O to await
+    return physical_relief_agent(state)
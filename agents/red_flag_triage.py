@@ -0,0 +1,133 @@
+# agents/red_flag_triage.py
+# Rule-based first pass for the emergency classifier. Clear red flags are
+# escalated without the LLM. A message skips the LLM as SAFE only when it is
+# short, mentions nothing concerning and is made up entirely of benign phrases
+# and filler words; anything else (including negated red flags, which the rules
+# can misread) goes to the model.
+import re
+
+EMERGENCY = "EMERGENCY"
+SAFE = "SAFE"
+REVIEW = "REVIEW"   # the check couldn't run; alert a caregiver to look
+
+# label -> pattern; a hit that isn't negated is an emergency on its own
+RED_FLAGS = {
+    "chest pain": (
+        r"chest (?:pain|pressure|tightness|hurts?|is hurting)|pain in (?:my |his |her )?chest|heart attack"
+        r"|jaw and (?:my |his |her )?left arm|left arm and (?:my |his |her )?jaw"
+    ),
+    "breathing difficulty": (
+        r"can'?t breathe|cannot breathe|unable to breathe|(?:difficulty|trouble|struggling) breathing"
+        r"|short(?:ness)? of breath|not breathing|stopped breathing|choking|gasping for (?:air|breath)"
+        r"|lips (?:are |is )?(?:turning |going )?blue|blue lips"
+    ),
+    "loss of consciousness": (
+        r"unconscious|passed out|fainted|unresponsive|collapsed|won'?t wake up|blacked out"
+        r"|(?:can'?t|cannot) wake (?:him|her|them|my \w+)(?: up)?"
+    ),
+    "heavy bleeding": (
+        r"heavy bleeding|bleeding (?:heavily|a lot|badly)|(?:bleeding|blood) (?:that )?(?:won'?t|will not|doesn'?t) stop"
+        r"|(?:vomiting|throwing up|coughing(?: up)?) blood|blood in (?:my )?(?:vomit|stool)"
+    ),
+    "stroke signs": (
+        # stroke in context only: not "heat stroke", "stroke of luck", a swimming stroke
+        # ("signs of a stroke" questions go to the model via CONCERNS)
+        r"(?:having|suffering|mini|possible|think (?:it'?s|i'?m having|(?:he|she)'?s having))"
+        r" (?:an? )?stroke\b(?! of\b)"
+        r"|face (?:is )?droop|drooping face|slurred speech|slurring (?:my |his |her )?words"
+        r"|(?:numbness|weakness|numb|weak) (?:on|in) one side|one side of (?:my |his |her )?(?:face|body)"
+    ),
+    "seizure": r"seizure|convulsion|convulsing",
+    "self harm": (
+        r"suicid|(?:kill|hurt|harm) (?:myself|himself|herself)|end (?:my|his|her) life|want to die|self[- ]harm|overdos"
+        r"|cut (?:my|his|her) wrists?|took (?:\d+|a lot of|too many|all (?:my|the|of (?:my|the))) (?:\w+ )?(?:pills|tablets)"
+    ),
+    "anaphylaxis": r"anaphyla|throat (?:is )?(?:closing|swelling)|swollen (?:throat|tongue)|severe allergic",
+    "poisoning": (
+        r"(?:drank|drunk|drink|swallowed|ingested|ate) (?:some |a lot of |the )?"
+        r"(?:bleach|poison|rat poison|pesticide|insecticide|detergent|antifreeze|kerosene|drain cleaner|cleaning (?:liquid|fluid|products?))"
+    ),
+}
+
+# Not emergencies by themselves, but too risky to wave through without the model
+CONCERNS = (
+    r"severe|sudden|worst|intense|unbearable|excruciating|extreme|emergency|urgent|ambulance|\b911\b|\b112\b|\b108\b"
+    r"|bleed|blood|faint|dizz|numb|confus|breath|chest|heart|palpitation|pregnan|baby|infant|newborn"
+    r"|poison|swallowed|allerg|swell|swollen|head injury|hit (?:my |his |her )?head|burn|fracture|broken bone"
+    r"|high fever|stiff neck|vision|(?:can'?t|cannot) (?:see|speak|talk|move|walk|get up|wake)|paralys|vomiting|dehydrat"
+    r"|bleach|chemical|hurt (?:myself|himself|herself)|\bhurt(?:s|ing)?\b|not (?:responding|waking|himself|herself)"
+    r"|\b(?:pills?|tablets?|wrists?|cut|wounds?|fell|fall(?:en)?|jaw|arms?|blue|sweat(?:ing|y)?)\b"
+    r"|overdose|injur|accident|stroke|pain"
+)
+
+# Positive evidence that a message is routine. SAFE needs the whole message to
+# be benign phrases plus FILLER words, no concern and at most BENIGN_MAX_WORDS
+# words: "hi, my husband is not responding" has words left over, so the model decides.
+BENIGN = (
+    r"\b(?:hi|hello|hey|good (?:morning|afternoon|evening)|thanks|thank you|ok(?:ay)?|bye|goodbye|great|got it|that helped)\b"
+    r"|\b(?:mild|slight|little|minor|bit of an?) (?:headache|cold|cough|sore throat|runny nose|congestion)\b"
+    r"|\b(?:runny|stuffy|blocked) nose\b|\bsneez\w*|\bcommon cold\b|\bhiccups?\b|\bdandruff\b|\bacne\b|\bdry skin\b"
+    r"|\bmosquito bites?\b|\b(?:can'?t|trouble) sleep\w*|\bsleep better\b|\bstress(?:ed)?\b"
+    r"|\byoga\b|\bstretch\w*|\bexercis\w*|\bmeditat\w*|\bhealthy (?:diet|food|eating)\b|\bdrink (?:more )?water\b"
+    r"|\b(?:clinic|pharmacy|chemist)\b|\b(?:open|opening hours|timings?)\b"
+)
+BENIGN_MAX_WORDS = 15
+# Words that may surround a benign phrase without changing what it asks
+FILLER = frozenset("""
+    i i'm im me my we our you your it it's its this that a an the some any
+    am is are was be been have has had got get do does did can could should would will
+    what how why when where which to for of on in at with about and or so
+    just bit really very too today tonight lately now again please
+    tip tips advice help suggest suggestions recommend remedy remedies home natural
+    best good better way ways reduce relieve manage treat cure stop fix deal cope rid more
+""".split())
+
+_RED_FLAGS = {label: re.compile(pattern, re.IGNORECASE) for label, pattern in RED_FLAGS.items()}
+_CONCERNS = re.compile(CONCERNS, re.IGNORECASE)
+_BENIGN = re.compile(BENIGN, re.IGNORECASE)
+_WORD = re.compile(r"[a-z']+")
+_NEGATION = re.compile(
+    r"\b(?:no|not|never|without|denies|deny|don'?t|doesn'?t|didn'?t|haven'?t|hasn'?t|isn'?t|wasn'?t|free of|ruled out)\b",
+    re.IGNORECASE,
+)
+_CLAUSE_BREAK = re.compile(r"[.;!?,]|\bbut\b|\bhowever\b|\bthough\b", re.IGNORECASE)
+NEGATION_WINDOW = 4  # words before a match that can negate it
+
+
+def _negated(text: str, start: int) -> bool:
+    before = text[:start]
+    breaks = list(_CLAUSE_BREAK.finditer(before))
+    clause = before[breaks[-1].end():] if breaks else before
+    window = " ".join(clause.split()[-NEGATION_WINDOW:])
+    return bool(_NEGATION.search(window))
+
+
+def _benign(text: str) -> bool:
+    if len(text.split()) > BENIGN_MAX_WORDS or not _BENIGN.search(text):
+        return False
+    rest = _BENIGN.sub(" ", text).lower()
+    return all(word in FILLER for word in _WORD.findall(rest))
+
+
+def triage(text: str):
+    """Return (verdict, red_flags): EMERGENCY or SAFE when the rules are sure, None to ask the LLM.
+
+    Fails closed: SAFE only on a positive benign match, never for want of a red flag.
+    """
+    text = str(text or "")
+    hits, negated_hits = [], []
+    for label, pattern in _RED_FLAGS.items():
+        for match in pattern.finditer(text):
+            if _negated(text, match.start()):
+                negated_hits.append(label)
+            else:
+                hits.append(label)
+                break
+
+    if hits:
+        return EMERGENCY, hits
+    if negated_hits or _CONCERNS.search(text):
+        return None, []
+    if _benign(text):
+        return SAFE, []
+    return None, []
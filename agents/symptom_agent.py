@@ -1,7 +1,7 @@
 #symptom_agent.py
 import json
 from datetime import datetime, timezone
-from langchain_openai import ChatOpenAI
+from shared.llm_provider import get_llm
 
 from shared.types import HealthBotState
 from dotenv import load_dotenv
@@ -10,11 +10,6 @@ from langchain_core.messages import AIMessage
 import os
 
 load_dotenv()
-llm = ChatOpenAI(
-    model="mistralai/mistral-7b-instruct",  # You can also use "openrouter/llama3-8b"
-    openai_api_key=os.environ["OPENROUTER_API_KEY"],
-    openai_api_base="https://openrouter.ai/api/v1",
-)
 
 # Recall keywords
 RECALL_KEYWORDS = [
@@ -25,11 +20,7 @@ RECALL_KEYWORDS = [
     "previous"
 ]
 
-def symptom_extractor_agent(state: HealthBotState) -> HealthBotState:
-    query = state["messages"][-1].content
-    user_id = state["user_id"]
-
-    system_prompt = f"""
+SYSTEM_PROMPT = """
 You are a helpful medical assistant.
 
 1. Extract: symptoms, stress_level, risk_score.
@@ -37,22 +28,27 @@ You are a helpful medical assistant.
 4. pass one or two word short symptoms.
 
 Respond ONLY in JSON format:
-{{
+{
   "symptoms": [...],
   "stress_level": "...",
   "risk_score": 0.3, 
   "response_message": "..."
-}}
+}
 """.strip()
 
-    result = llm.invoke([
-        {"role": "system", "content": system_prompt},
+
+def _symptom_messages(query: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user",   "content": query}
-    ])
+    ]
 
+
+# Runs in parallel with the other pre-routing nodes, so it returns only the keys it owns
+def _symptom_update(state: HealthBotState, content: str) -> dict:
     # Parse JSON
     try:
-        parsed = json.loads(result.content)
+        parsed = json.loads(content)
     except json.JSONDecodeError:
         parsed = {
             "symptoms": [],
@@ -63,7 +59,11 @@ Respond ONLY in JSON format:
                 "Could you please tell me more about your symptoms?"
             )
         }
+    return symptom_fields(state, parsed)
+
 
+# Shared with the combined triage node, which gets the same fields from its own call
+def symptom_fields(state: HealthBotState, parsed: dict) -> dict:
     # Update state
     existing = state.get("symptoms", [])
     new = parsed.get("symptoms", [])
@@ -74,15 +74,29 @@ Respond ONLY in JSON format:
         if s not in seen:
             seen.add(s)
             unique.append(s)
-    state["symptoms"] = unique
-
-    state["stress_level"]    = parsed.get("stress_level", "unknown")
-    state["risk_score"]      = parsed.get("risk_score", 0.1)
-    state["response_message"] = parsed.get(
-        "response_message",
-        "I'm here to help. What can I do for you today?"
-    )
+
+    update = {
+        "symptoms": unique,
+        "stress_level": parsed.get("stress_level", "unknown"),
+        "risk_score": parsed.get("risk_score", 0.1),
+        "response_message": parsed.get(
+            "response_message",
+            "I'm here to help. What can I do for you today?"
+        ),
+    }
     
-    print(f"#### symptoms extracted: {state['symptoms']}")
+    print(f"#### symptoms extracted: {update['symptoms']}")
 
-    return state
+    return update
+
+
+def symptom_extractor_agent(state: HealthBotState) -> dict:
+    query = state["messages"][-1].content
+    result = get_llm().invoke(_symptom_messages(query))
+    return _symptom_update(state, result.content)
+
+
+async def asymptom_extractor_agent(state: HealthBotState) -> dict:
+    query = state["messages"][-1].content
+    result = await get_llm().ainvoke(_symptom_messages(query))
+    return _symptom_update(state, result.content)
@@ -0,0 +1,121 @@
+# agents/triage_agent.py
+# Combined triage: symptoms, emergency verdict and intents from one structured
+# LLM call instead of three. Selected with build_healthbot_workflow(triage_mode="combined");
+# fills exactly the state the three separate nodes fill.
+import asyncio
+import json
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, ValidationError
+
+from shared.types import HealthBotState
+from shared.llm_provider import get_llm
+from agents.symptom_agent import symptom_fields, symptom_extractor_agent, asymptom_extractor_agent
+from agents.emergency_alert_agent import (
+    rule_verdict_update,
+    arule_verdict_update,
+    llm_verdict_update,
+    allm_verdict_update,
+)
+from agents.intent_classifier_agent import (
+    local_intents,
+    llm_intent_update,
+    allm_intent_update,
+    latest_human_message,
+)
+
+
+class TriageResult(BaseModel):
+    symptoms: List[str] = Field(default_factory=list, description="one or two word symptom names")
+    stress_level: str = Field("unknown", description="low, moderate, high or unknown")
+    risk_score: float = Field(0.1, ge=0.0, le=1.0)
+    response_message: str = Field("I'm here to help. What can I do for you today?", description="short friendly advice")
+    emergency: bool = Field(False, description="true for any serious or urgent condition like chest pain, unconsciousness, bleeding")
+    intents: List[Literal["home_remedy", "info_search", "physical_relief", "general_medical"]] = Field(default_factory=list)
+
+
+SYSTEM_PROMPT = f"""
+You are the combined triage step of a medical chatbot. From the user's message, in one pass:
+
+1. Extract symptoms (one or two words each), stress_level and risk_score (0 to 1), and give friendly advice in response_message.
+2. Set emergency to true if the message suggests any serious or urgent condition like chest pain, unconsciousness, bleeding, etc.
+3. List every applicable intent:
+- home_remedy: managing symptoms or minor conditions at home.
+- physical_relief: stress relief, sleep, yoga, breathing or other physical wellness practices.
+- info_search: hospitals, clinics, medicines, services or opening hours.
+- general_medical: medical education, diseases, prevention, lifestyle and anything else medical.
+
+Respond ONLY with a JSON object matching this schema, no other text:
+{json.dumps(TriageResult.model_json_schema())}
+""".strip()
+
+
+def _triage_messages(query: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": query},
+    ]
+
+
+def parse_triage(content: str) -> TriageResult:
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    return TriageResult.model_validate_json(text)
+
+
+def _triage_update(state: HealthBotState, result: TriageResult, emergency: dict, local: list) -> dict:
+    update = symptom_fields(state, result.model_dump(include={"symptoms", "stress_level", "risk_score", "response_message"}))
+    update.update(emergency if emergency is not None else {
+        "_emergency_verdict": "EMERGENCY" if result.emergency else "SAFE",
+        "_emergency_source": "llm",
+    })
+    if local:
+        update.update({"intents": local, "_intent_source": "local"})
+    else:
+        update.update({"intents": list(dict.fromkeys(result.intents)) or ["fallback"], "_intent_source": "llm"})
+    print(f"**[Triage] symptoms={update['symptoms']} verdict={update['_emergency_verdict']} intents={update['intents']}")
+    return update
+
+
+def triage_agent(state: HealthBotState) -> dict:
+    query = state["messages"][-1].content
+    # the deterministic checks run first, exactly as in the separate nodes
+    emergency = rule_verdict_update(state)
+    local = local_intents(latest_human_message(state))
+
+    content = get_llm().invoke(_triage_messages(query)).content
+    try:
+        return _triage_update(state, parse_triage(content), emergency, local)
+    except (ValidationError, ValueError) as e:
+        # invalid structured output: ask the questions one at a time instead
+        print(f"[Triage] output failed validation, using separate calls: {e}")
+        update = symptom_extractor_agent(state)
+        update.update(emergency if emergency is not None else llm_verdict_update(state))
+        update.update({"intents": local, "_intent_source": "local"} if local else llm_intent_update(latest_human_message(state)))
+        return update
+
+
+async def atriage_agent(state: HealthBotState) -> dict:
+    query = state["messages"][-1].content
+    emergency = await arule_verdict_update(state)
+    local = local_intents(latest_human_message(state))
+
+    content = (await get_llm().ainvoke(_triage_messages(query))).content
+    try:
+        return _triage_update(state, parse_triage(content), emergency, local)
+    except (ValidationError, ValueError) as e:
+        print(f"[Triage] output failed validation, using separate calls: {e}")
+
+        async def verdict():
+            return emergency if emergency is not None else await allm_verdict_update(state)
+
+        async def intents():
+            if local:
+                return {"intents": local, "_intent_source": "local"}
+            return await allm_intent_update(latest_human_message(state))
+
+        update = {}
+        for part in await asyncio.gather(asymptom_extractor_agent(state), verdict(), intents()):
+            update.update(part)
+        return update
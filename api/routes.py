@@ -1,16 +1,36 @@
 # api/routes.py
-from fastapi import APIRouter, Request
-from pydantic import BaseModel
-from workflows.workflow import build_healthbot_workflow
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import Optional
+from collections import defaultdict
+from workers.memory_jobs import submit_memory_job
+import json
+import asyncio
+import os
+import threading
 from langchain_core.messages import HumanMessage
 from uuid import uuid4
 from datetime import datetime
 from shared.types import HealthBotState
-from db.postgres_adapter import get_message_history_ui
+from shared.resilience import new_deadline
+from db.postgres_adapter import aget_message_history_page, iter_symptom_logs, HISTORY_PAGE_MAX
 router = APIRouter()
 
-# Load the compiled graph
-graph = build_healthbot_workflow()
+# The compiled graph, built on first use (or warmed by main.py's startup); memory
+# is written after the response by workers/memory_jobs.py
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            from workflows.workflow import build_healthbot_workflow
+            _graph = build_healthbot_workflow()
+    return _graph
 
 # Input model
 class ChatRequest(BaseModel):
@@ -27,41 +47,69 @@ class ChatResponse(BaseModel):
     suspected_diseases: list
     recommended_path: str
     history: list[str]
+    skipped_nodes: list[str] = []   # agents dropped for the deadline; the response is partial
+
+# Batch models
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "4"))
+CHAT_BATCH_MAX_CONCURRENCY = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", "32"))
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "500"))
+
+class BatchChatRequest(BaseModel):
+    items: list[ChatRequest] = Field(..., max_length=CHAT_BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(None, ge=1)
+
+class BatchChatItem(BaseModel):
+    index: int
+    user_id: str
+    ok: bool
+    result: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    results: list[BatchChatItem]
+    succeeded: int
+    failed: int
 
 @router.get("/history/{user_id}")
-async def get_history(user_id: str):
-    
-     return {"history": get_message_history_ui(user_id, limit=10)}   
+async def get_history(user_id: str, limit: int = Query(10, ge=1, le=HISTORY_PAGE_MAX), cursor: Optional[str] = None):
+    # pass next_cursor back as ?cursor= for the following (older) page
+    try:
+        history, next_cursor = await aget_message_history_page(user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"history": history, "next_cursor": next_cursor}
+
+
+# Both below stream from a server-side cursor: constant memory, first rows out immediately.
+# Starlette iterates the sync generators in its threadpool, so the session never blocks the loop.
+@router.get("/history/{user_id}/export")
+def export_history(user_id: str):
+    def ndjson():
+        for row in iter_symptom_logs(user_id):
+            yield json.dumps(row) + "\n"
+
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{user_id}_history.ndjson"'},
+    )
 
 
 @router.get("/debug/raw_history/{user_id}")
-async def debug_raw(user_id: str):
-    from db.postgres_adapter import SessionLocal, SymptomLog
-    session = SessionLocal()
-    rows = (
-        session
-        .query(SymptomLog)
-        .filter_by(user_id=user_id)
-        .order_by(SymptomLog.timestamp.asc())    
-        .all()
-    )
-    session.close()
-    return [
-        {
-            "id":      r.id,
-            "query":   r.query,
-            "symptoms":r.symptoms,
-            "ts":      r.timestamp.isoformat()
-        }
-        for r in rows
-    ]
+def debug_raw(user_id: str):
+    def json_array():
+        yield "["
+        for i, row in enumerate(iter_symptom_logs(user_id)):
+            raw = {k: row[k] for k in ("id", "query", "symptoms", "ts")}
+            yield ("," if i else "") + json.dumps(raw)
+        yield "]"
 
+    return StreamingResponse(json_array(), media_type="application/json")
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_with_bot(request: ChatRequest):
-    
-    state: HealthBotState = {
+
+def _initial_state(request: ChatRequest) -> HealthBotState:
+    return {
     "user_id": request.user_id,
     "messages": [HumanMessage(content=request.message)],
     "symptoms": [], 
@@ -78,16 +126,12 @@ async def chat_with_bot(request: ChatRequest):
     "_search_results": [],  
     "agent_outputs": {},  
     "session_id": str(uuid4()),
-    "memory_context": []  
+    "memory_context": [],
+    "_deadline": new_deadline(),
     }
 
 
-    final_state = graph.invoke(state)
-
-    print("Returning summary response 1:", final_state.get("agent_outputs", {}).get("final_summary", "None"))
-
-    
-
+def _chat_response(final_state: HealthBotState) -> ChatResponse:
     return ChatResponse(
         response=final_state.get("agent_outputs", {}).get("final_summary", "Sorry, I couldn’t find a helpful summary."),
         symptoms=final_state.get("symptoms", []),
@@ -95,7 +139,110 @@ async def chat_with_bot(request: ChatRequest):
         alert_sent=final_state.get("alert_sent", False),
         suspected_diseases=final_state.get("suspected_diseases", []),
         recommended_path=final_state.get("recommended_path", ""),
-        history=final_state.get("memory_context", [])
+        history=final_state.get("memory_context", []),
+        skipped_nodes=final_state.get("skipped_nodes", []),
+    )
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat_with_bot(request: ChatRequest):
+    
+    state = _initial_state(request)
+
+
+    final_state = await get_graph().ainvoke(state)
+
+    print("Returning summary response 1:", final_state.get("agent_outputs", {}).get("final_summary", "None"))
+
+    await submit_memory_job(final_state)
+
+    return _chat_response(final_state)
+
+
+# Streaming
+# State fields worth showing as soon as the node that owns them finishes
+PROGRESS_FIELDS = {
+    "extract_symptoms": ["symptoms", "stress_level", "risk_score"],
+    "emergency_classifier": ["_emergency_verdict"],
+    "emergency_alert": ["alert_sent", "emergency_flags", "risk_score"],
+    "intent_classifier": ["intents"],
+    "triage": ["symptoms", "stress_level", "risk_score", "_emergency_verdict", "intents"],
+    "home_remedy": ["suspected_diseases"],
+}
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _progress_event(node: str, update) -> dict:
+    update = update if isinstance(update, dict) else {}
+    event = {"node": node}
+    for field in PROGRESS_FIELDS.get(node, []):
+        if field in update:
+            event[field.lstrip("_")] = update[field]
+    return event
+
+
+async def _chat_events(state: HealthBotState, result: dict):
+    try:
+        async for mode, chunk in get_graph().astream(state, stream_mode=["updates", "messages", "values"]):
+            if mode == "updates":
+                for node, update in chunk.items():
+                    yield _sse("progress", _progress_event(node, update))
+            elif mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "final_summary" and message.content:
+                    yield _sse("token", {"text": message.content})
+            else:
+                result["state"] = chunk
+    except Exception as e:
+        print(f"[chat_stream] failed: {e}")
+        yield _sse("error", {"detail": str(e)})
+        return
+
+    yield _sse("done", _chat_response(result["state"]).model_dump())
+
+
+async def _write_memory(result: dict):
+    if "state" in result:
+        await submit_memory_job(result["state"])
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Server-sent events: progress per node, final_summary tokens, then the full response."""
+    result = {}
+    return StreamingResponse(
+        _chat_events(_initial_state(request), result),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(_write_memory, result),
     )
 
 
+# Batch
+@router.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest):
+    """Run many chats through the shared graph with at most `concurrency` in flight.
+
+    Items for the same user run in order, so each sees the memory the previous one wrote.
+    """
+    concurrency = min(request.concurrency or CHAT_BATCH_CONCURRENCY, CHAT_BATCH_MAX_CONCURRENCY)
+    slots = asyncio.Semaphore(concurrency)
+    user_locks = defaultdict(asyncio.Lock)
+
+    async def run(index: int, item: ChatRequest) -> BatchChatItem:
+        async with user_locks[item.user_id]:
+            async with slots:
+                try:
+                    final_state = await get_graph().ainvoke(_initial_state(item))
+                    await submit_memory_job(final_state)
+                    return BatchChatItem(index=index, user_id=item.user_id, ok=True, result=_chat_response(final_state))
+                except Exception as e:
+                    print(f"[chat_batch] item {index} failed: {e}")
+                    return BatchChatItem(index=index, user_id=item.user_id, ok=False, error=str(e))
+
+    results = await asyncio.gather(*(run(i, item) for i, item in enumerate(request.items)))
+    succeeded = sum(1 for r in results if r.ok)
+    return BatchChatResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
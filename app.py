@@ -1,17 +1,10 @@
 import streamlit as st
 import requests
 import speech_recognition as sr
-from gtts import gTTS
-from tempfile import NamedTemporaryFile
 import json
-import threading
-import time
-import numpy as np
-import sounddevice as sd
-import whisper
-from scipy.io.wavfile import write 
+from voice.pipeline import VoicePipeline
+from voice.tts import speak, mime_type
 
-model = whisper.load_model("base")  
 
 st.set_page_config(page_title="HealthBot AI", page_icon="🩺", layout="wide")
 
@@ -58,7 +51,7 @@ defaults = {
     "location": "",
     "chat_started": False,
     "messages": [],
-    "voice_thread_started": False,
+    "voice_pipeline": None,
     "last_audio_file": None
 }
 for key, default in defaults.items():
@@ -81,12 +74,31 @@ def record_and_transcribe():
             st.error(f" STT API error: {e}")
     return ""
 
-#  TTS 
+#  TTS: returns the audio path (also called from the voice pipeline's thread).
+# Cached on disk by text (voice/tts.py), so repeated replies aren't synthesized again
 def speak_text(text):
-    tts = gTTS(text=text, lang='en')
-    with NamedTemporaryFile(delete=False, suffix=".mp3") as tmpfile:
-        tts.save(tmpfile.name)
-        st.session_state.last_audio_file = tmpfile.name
+    return speak(text)
+
+#  Streaming chat: yields final_summary tokens from /chat/stream, fills `final` on done
+def stream_chat(message, final):
+    with requests.post("http://localhost:8000/chat/stream", json={
+        "user_id": st.session_state.user_id,
+        "message": message,
+        "location": st.session_state.location
+    }, stream=True) as res:
+        res.raise_for_status()
+        event = None
+        for line in res.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "token":
+                    yield data["text"]
+                elif event == "done":
+                    final.update(data)
+                elif event == "error":
+                    raise RuntimeError(data.get("detail", "stream failed"))
 
 #  Chat History 
 def fetch_user_history(user_id):
@@ -95,43 +107,41 @@ def fetch_user_history(user_id):
         return res.json()["history"]
     return []
 
-#  Real-time voice loop 
-def realtime_voice_loop():
-    duration = 10
-    samplerate = 16000
-
-    while st.session_state.get("chat_started", False):
-        try:
-            st.session_state.messages.append(("System", "🎤 Listening..."))
-            audio = sd.rec(int(duration * samplerate), samplerate=samplerate, channels=1)
-            sd.wait()
-            audio = np.squeeze(audio)
-
-            with NamedTemporaryFile(suffix=".wav", delete=False) as tmp_wav:
-                write(tmp_wav.name, samplerate, audio)
-                result = model.transcribe(tmp_wav.name, fp16=False, condition_on_previous_text=False)
-                text = result["text"].strip()
-
-            if text:
-                st.session_state.messages.append(("You", text))
-                try:
-                    res = requests.post("http://localhost:8000/chat", json={
-                        "user_id": st.session_state.user_id,
-                        "message": text,
-                        "location": st.session_state.location
-                    })
-                    if res.status_code == 200:
-                        reply = res.json()["response"]
-                        st.session_state.messages.append(("HealthBot", reply))
-                        speak_text(reply)
-                    else:
-                        st.session_state.messages.append(("HealthBot", " No reply."))
-                except Exception as e:
-                    st.session_state.messages.append(("HealthBot", f" Error: {e}"))
-
-        except Exception as e:
-            st.session_state.messages.append(("System", f" Voice Error: {e}"))
-        time.sleep(5)
+#  Continuous voice mode 
+# record -> transcribe -> chat -> speak run as pipelined stages (voice/pipeline.py),
+# so the mic keeps listening while the bot answers. The stages never touch
+# st.session_state: their events are drained here, on the script thread.
+def chat_reply(text, user_id, location):
+    try:
+        res = requests.post("http://localhost:8000/chat", json={
+            "user_id": user_id,
+            "message": text,
+            "location": location
+        })
+        if res.status_code == 200:
+            return res.json()["response"]
+        return " No reply."
+    except Exception as e:
+        return f" Error: {e}"
+
+
+def start_voice_pipeline():
+    old = st.session_state.voice_pipeline
+    if old is not None:
+        old.stop()
+    user_id, location = st.session_state.user_id, st.session_state.location
+    pipeline = VoicePipeline(chat=lambda text: chat_reply(text, user_id, location), speak=speak_text)
+    pipeline.start()
+    st.session_state.voice_pipeline = pipeline
+
+
+def apply_voice_events():
+    pipeline = st.session_state.voice_pipeline
+    for kind, payload in pipeline.drain_events() if pipeline else []:
+        if kind == "audio":
+            st.session_state.last_audio_file = payload
+        else:
+            st.session_state.messages.append((kind, payload))
 
 # Sidebar UI
 with st.sidebar:
@@ -140,7 +150,7 @@ with st.sidebar:
     st.session_state.location = st.text_input(" Location", value=st.session_state.location)
     if st.button("Start Chat"):
         st.session_state.chat_started = True
-        st.session_state.voice_thread_started = False
+        start_voice_pipeline()
 
 # Main Title
 st.markdown("##  HealthBot AI Assistant")
@@ -148,9 +158,8 @@ st.markdown("Talk with your smart **HealthBot** using **voice or text**.\nGet he
 
 # Chat Section 
 if st.session_state.chat_started:
-    if not st.session_state.voice_thread_started:
-        threading.Thread(target=realtime_voice_loop, daemon=True).start()
-        st.session_state.voice_thread_started = True
+    if st.session_state.voice_pipeline is None:
+        start_voice_pipeline()
 
     col1, col2 = st.columns([4, 1])
     with col1:
@@ -164,36 +173,35 @@ if st.session_state.chat_started:
         with st.chat_message("user"):
             st.markdown(user_input)
         with st.chat_message("assistant"):
-            with st.spinner("# HealthBot is thinking..."):
-                try:
-                    res = requests.post("http://localhost:8000/chat", json={
-                        "user_id": st.session_state.user_id,
-                        "message": user_input,
-                        "location": st.session_state.location
-                    })
-                    if res.status_code == 200:
-                        reply = res.json()["response"]
-                        st.session_state.messages.append(("HealthBot", reply))
-                        speak_text(reply)
-                        st.markdown(reply)
-                    else:
-                        reply = " No response received."
-                        st.session_state.messages.append(("HealthBot", reply))
-                        st.markdown(reply)
-                except Exception as e:
-                    reply = f" Error: {e}"
-                    st.session_state.messages.append(("HealthBot", reply))
+            try:
+                final = {}
+                streamed = st.write_stream(stream_chat(user_input, final))
+                reply = final.get("response") or streamed
+                if not reply:
+                    reply = " No response received."
+                if not streamed:
                     st.markdown(reply)
-
-    # Chat Bubble Display
-    st.markdown("----")
-    st.markdown("###  Recent Conversation")
-    for sender, msg in reversed(st.session_state.messages[-8:]):
-        with st.chat_message("user" if sender == "You" else "assistant" if sender == "HealthBot" else "system"):
-            st.markdown(msg)
-
-    if st.session_state.last_audio_file:
-        st.audio(st.session_state.last_audio_file, format="audio/mp3")
+                st.session_state.messages.append(("HealthBot", reply))
+                st.session_state.last_audio_file = speak_text(reply)
+            except Exception as e:
+                reply = f" Error: {e}"
+                st.session_state.messages.append(("HealthBot", reply))
+                st.markdown(reply)
+
+    # Chat Bubble Display: reruns on its own every second so voice turns show up
+    @st.fragment(run_every=1)
+    def recent_conversation():
+        apply_voice_events()
+        st.markdown("----")
+        st.markdown("###  Recent Conversation")
+        for sender, msg in reversed(st.session_state.messages[-8:]):
+            with st.chat_message("user" if sender == "You" else "assistant" if sender == "HealthBot" else "system"):
+                st.markdown(msg)
+
+        if st.session_state.last_audio_file:
+            st.audio(st.session_state.last_audio_file, format=mime_type(st.session_state.last_audio_file))
+
+    recent_conversation()
 
 else:
     st.info(" Enter user info and click **Start Chat** to begin.")
@@ -0,0 +1,142 @@
+# benchmarks/fakes.py
+# Local stand-ins for OpenRouter, Tavily and Twilio with configurable latency and canned replies.
+import asyncio
+import json
+import time
+from typing import List, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# (substring of the prompt, canned reply); first match wins
+CANNED_REPLIES: List[Tuple[str, str]] = [
+    ("combined triage step", json.dumps({
+        "symptoms": ["headache", "fever"],
+        "stress_level": "moderate",
+        "risk_score": 0.3,
+        "response_message": "Rest, drink fluids and monitor your temperature.",
+        "emergency": False,
+        "intents": ["home_remedy", "info_search"],
+    })),
+    ("respond only in json", json.dumps({
+        "symptoms": ["headache", "fever"],
+        "stress_level": "moderate",
+        "risk_score": 0.3,
+        "response_message": "Rest, drink fluids and monitor your temperature.",
+    })),
+    ("emergency classifier", "SAFE"),
+    ("intent classifier", "home_remedy,info_search"),
+    ("rewrite this user query", "hospitals near me for fever"),
+    ("cautious medical assistant",
+     "Suspected Disease(s):\n- Viral fever\n- Migraine\n\n"
+     "Remedies:\n1. Rest and hydrate\n2. Cold compress\n3. Ginger tea"),
+    ("summarize this ai response", "User had headache and fever; advised rest and fluids."),
+]
+DEFAULT_REPLY = (
+    "Home Remedies:\n- Rest and hydrate\n- Cold compress\n\n"
+    "Summary: Likely a viral fever; see a doctor if it lasts more than 3 days."
+)
+
+
+def canned_reply(prompt: str) -> str:
+    prompt = prompt.lower()
+    for needle, reply in CANNED_REPLIES:
+        if needle in prompt:
+            return reply
+    return DEFAULT_REPLY
+
+
+def _prompt_text(messages) -> str:
+    return "\n".join(str(m.content) for m in messages)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that sleeps ``latency`` seconds, then answers from CANNED_REPLIES."""
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-openrouter"
+
+    def _message(self, reply: str, prompt: str) -> AIMessage:
+        prompt_tokens, completion_tokens = len(prompt.split()), len(reply.split())
+        return AIMessage(content=reply, usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        })
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        prompt = _prompt_text(messages)
+        return ChatResult(generations=[ChatGeneration(message=self._message(canned_reply(prompt), prompt))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        prompt = _prompt_text(messages)
+        return ChatResult(generations=[ChatGeneration(message=self._message(canned_reply(prompt), prompt))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for word in canned_reply(_prompt_text(messages)).split(" "):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for word in canned_reply(_prompt_text(messages)).split(" "):
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class FakeSearchTool:
+    """Tavily stand-in returning the same result shape as TavilySearch."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def _result(self, query: str) -> dict:
+        return {
+            "query": query,
+            "results": [
+                {"title": "City General Hospital", "url": "https://example.org/cgh",
+                 "content": "24x7 emergency care, general medicine and fever clinic.", "score": 0.9},
+                {"title": "Sunrise Clinic", "url": "https://example.org/sunrise",
+                 "content": "Walk-in clinic open 8am-10pm, in-house pharmacy.", "score": 0.8},
+            ],
+        }
+
+    def invoke(self, query, *args, **kwargs):
+        time.sleep(self.latency)
+        return self._result(query)
+
+    async def ainvoke(self, query, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result(query)
+
+
+class _FakeMessages:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = []
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        self.sent.append(kwargs)
+        return kwargs
+
+
+class FakeTwilioClient:
+    """twilio.rest.Client stand-in; only messages.create is used."""
+
+    def __init__(self, latency: float = 0.0):
+        self.messages = _FakeMessages(latency)
@@ -0,0 +1,227 @@
+# benchmarks/run.py
+# Offline benchmark of the HealthBot graph against local stand-ins (no network needed).
+#
+#   python -m benchmarks.run --requests 200 --concurrency 1,8,32 --llm-latency 0.05
+#
+# With the default zero latencies the numbers are pure framework overhead:
+# graph construction, state merging, routing and DB access.
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from unittest import mock
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+MESSAGES = [
+    "I have a headache and mild fever since yesterday",
+    "Are there hospitals near me that are open at night?",
+    "My lower back hurts after sitting all day",
+    "What is the normal blood pressure for someone my age?",
+    "Sore throat and cough, any home remedies?",
+    "Feeling stressed and can't sleep well",
+]
+
+
+def _configure_env(args):
+    # must run before any app module is imported: they read these at import time
+    db_dir = tempfile.mkdtemp(prefix="healthbot-bench-")
+    os.environ["POSTGRES_URL"] = args.db_url or f"sqlite:///{db_dir}/bench.db"
+    os.environ.setdefault("OPENROUTER_API_KEY", "offline")
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    if not args.cache:
+        os.environ["LLM_CACHE_DISABLED_AGENTS"] = "all"
+        os.environ["SEARCH_CACHE_MAXSIZE"] = "0"
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time per graph node, from LangChain chain callbacks."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._starts = {}
+        self.samples = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # nested runnables inside a node carry the same metadata; time the outermost one only
+        parent = self._starts.get(parent_run_id)
+        if node and kwargs.get("name") == node and not (parent and parent[0] == node):
+            self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self._starts.pop(run_id, None)
+        if started:
+            node, t0 = started
+            self.samples[node].append(time.perf_counter() - t0)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(values) -> dict:
+    return {
+        "n": len(values),
+        "mean_ms": 1000 * sum(values) / len(values) if values else 0.0,
+        "p50_ms": 1000 * _percentile(values, 50),
+        "p95_ms": 1000 * _percentile(values, 95),
+        "p99_ms": 1000 * _percentile(values, 99),
+    }
+
+
+async def _run_load(graph, initial_state, total, concurrency, callbacks=None):
+    slots = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with slots:
+            state = initial_state(i)
+            t0 = time.perf_counter()
+            try:
+                await graph.ainvoke(state, config={"callbacks": callbacks or []})
+                latencies.append(time.perf_counter() - t0)
+            except Exception as e:
+                errors += 1
+                print(f"[bench] request {i} failed: {e}")
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - t0
+    return latencies, errors, elapsed
+
+
+async def _memory_per_request(graph, initial_state, total):
+    tracemalloc.start()
+    peaks = []
+    for i in range(total):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        await graph.ainvoke(initial_state(i))
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - baseline)
+    tracemalloc.stop()
+    return {"mean_kib": sum(peaks) / len(peaks) / 1024, "max_kib": max(peaks) / 1024}
+
+
+def _print_table(title, rows):
+    print(f"\n== {title}")
+    print(f"{'name':<22}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, s in rows:
+        print(f"{name:<22}{s['n']:>6}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}")
+
+
+async def run(args) -> dict:
+    from benchmarks.fakes import FakeChatModel, FakeSearchTool, FakeTwilioClient
+    from shared.llm_provider import set_llm_override, get_llm_usage
+    from agents import info_search_agent
+    from workers import alert_dispatcher
+    from workflows.workflow import build_healthbot_workflow
+    from api.routes import ChatRequest, _initial_state
+    from db.postgres_adapter import init_db, adispose_engines
+
+    set_llm_override(FakeChatModel(latency=args.llm_latency))
+    patches = [
+        mock.patch.object(info_search_agent, "search_tool", FakeSearchTool(latency=args.search_latency)),
+        mock.patch.object(alert_dispatcher, "twilio_client", FakeTwilioClient(latency=args.twilio_latency)),
+    ]
+    for p in patches:
+        p.start()
+    init_db()
+
+    def initial_state(i):
+        return _initial_state(ChatRequest(
+            user_id=f"bench-user-{i % args.users}",
+            message=MESSAGES[i % len(MESSAGES)],
+            location="Pune",
+        ))
+
+    report = {"config": vars(args)}
+    try:
+        builds = []
+        for _ in range(args.builds):
+            t0 = time.perf_counter()
+            graph = build_healthbot_workflow(triage_mode=args.triage_mode)
+            builds.append(time.perf_counter() - t0)
+        report["graph_build"] = _summary(builds)
+
+        # warm-up: imports, DB schema, first-connection costs
+        await _run_load(graph, initial_state, min(5, args.requests), 1)
+
+        timer = NodeTimer()
+        latencies, errors, elapsed = await _run_load(graph, initial_state, args.requests, 1, [timer])
+        report["nodes"] = {node: _summary(v) for node, v in sorted(timer.samples.items())}
+        report["end_to_end"] = {}
+        for concurrency in args.concurrency:
+            latencies, errors, elapsed = await _run_load(graph, initial_state, args.requests, concurrency)
+            report["end_to_end"][concurrency] = {
+                **_summary(latencies),
+                "errors": errors,
+                "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+            }
+        report["memory_per_request"] = await _memory_per_request(graph, initial_state, args.memory_requests)
+        report["llm_usage"] = get_llm_usage()
+    finally:
+        for p in patches:
+            p.stop()
+        set_llm_override(None)
+        await adispose_engines()  # aiosqlite's connection threads would keep the process alive
+    return report
+
+
+def _print_report(report):
+    _print_table("graph construction", [("build_healthbot_workflow", report["graph_build"])])
+    _print_table("per-node latency (concurrency 1)", list(report["nodes"].items()))
+    _print_table("end-to-end latency", [(f"concurrency={c}", s) for c, s in report["end_to_end"].items()])
+    print("\n== throughput")
+    for c, s in report["end_to_end"].items():
+        print(f"concurrency={c:<6} {s['throughput_rps']:>8.1f} req/s  errors={s['errors']}")
+    mem = report["memory_per_request"]
+    print(f"\n== memory per request: mean {mem['mean_kib']:.1f} KiB, max {mem['max_kib']:.1f} KiB (tracemalloc peak)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline HealthBot graph benchmark")
+    parser.add_argument("--requests", type=int, default=50, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 4, 16])
+    parser.add_argument("--users", type=int, default=10, help="distinct user ids to spread requests over")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds per fake Tavily call")
+    parser.add_argument("--twilio-latency", type=float, default=0.0, help="seconds per fake Twilio send (alert dispatcher only)")
+    parser.add_argument("--triage-mode", choices=["separate", "combined"], default="separate",
+                        help="three parallel pre-routing LLM calls, or one combined triage call")
+    parser.add_argument("--builds", type=int, default=5, help="graph constructions to time")
+    parser.add_argument("--memory-requests", type=int, default=10)
+    parser.add_argument("--cache", action="store_true", help="keep LLM/search response caches on")
+    parser.add_argument("--db-url", default=None, help="defaults to a throwaway SQLite file")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report here")
+    parser.add_argument("--verbose", action="store_true", help="keep the agents' print output")
+    args = parser.parse_args()
+
+    _configure_env(args)
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+        report = asyncio.run(run(args))
+    _print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
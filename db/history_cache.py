@@ -0,0 +1,111 @@
+# db/history_cache.py
+# Per-user cache of recent conversation pairs, symptom logs and symptom events.
+# Entries are loaded once from the DB, kept current by write-through from the
+# log writers, and dropped by LRU/TTL. It is per process: with several API
+# workers another process's writes show up once the entry expires.
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from shared.cache import TTLCache
+
+
+def utc_naive(ts: datetime) -> datetime:
+    # the DB hands back naive UTC; writers pass aware UTC
+    if ts is not None and ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+class UserHistory:
+    def __init__(self, depth: int, conversations, symptom_logs, events, events_since: datetime):
+        self.conversations = deque(conversations, maxlen=depth)   # oldest first
+        self.symptom_logs = deque(symptom_logs, maxlen=depth)     # oldest first
+        self.events = events            # [(symptom, timestamp)] since events_since, or None if too many
+        self.events_since = events_since
+        self.lock = threading.Lock()
+
+    def recent(self, rows, limit: int) -> list:
+        with self.lock:
+            return list(rows)[-limit:] if limit > 0 else []
+
+    def count_events(self, names, cutoffs: dict):
+        """{days: {name: count}}, or None when the cached events don't cover a window."""
+        with self.lock:
+            if self.events is None or min(cutoffs.values()) < self.events_since:
+                return None
+            counts = {days: dict.fromkeys(names, 0) for days in cutoffs}
+            for symptom, ts in self.events:
+                if symptom in names:
+                    for days, cutoff in cutoffs.items():
+                        if ts >= cutoff:
+                            counts[days][symptom] += 1
+            return counts
+
+
+class HistoryCache:
+    """``loader(user_id, depth, event_days, max_events)`` returns (conversations, symptom_logs, events)."""
+
+    def __init__(self, loader, maxsize: int = 1000, ttl: float = 300.0, depth: int = 20,
+                 event_days: int = 30, max_events: int = 500):
+        self.loader = loader
+        self.depth = depth
+        self.event_days = event_days
+        self.max_events = max_events
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._loading = {}      # user_id -> written to while loading
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str):
+        """Cached history for the user, loading it on a miss; (history, hit)."""
+        history = self._entries.get(user_id)
+        if history is not None:
+            return history, True
+
+        with self._lock:
+            self._loading[user_id] = False
+        events_since = datetime.utcnow() - timedelta(days=self.event_days)
+        conversations, symptom_logs, events = self.loader(user_id, self.depth, self.event_days, self.max_events)
+        if events is not None and len(events) > self.max_events:
+            events = None
+        history = UserHistory(self.depth, conversations, symptom_logs, events, events_since)
+        with self._lock:
+            # a write landed mid-load and may be missing from what we read: serve it, don't keep it
+            written = self._loading.pop(user_id, True)
+        if not written:
+            self._entries.set(user_id, history)
+        return history, False
+
+    def cached(self, user_id: str):
+        """The cached history, or None on a miss (never loads)."""
+        return self._entries.get(user_id)
+
+    def add_conversation(self, user_id: str, row: dict):
+        self._write(user_id, lambda h: h.conversations.append(row))
+
+    def add_symptom_log(self, user_id: str, row: dict, symptoms):
+        def apply(history):
+            history.symptom_logs.append(row)
+            if history.events is not None:
+                history.events.extend((s, row["timestamp"]) for s in symptoms)
+                if len(history.events) > self.max_events:
+                    history.events = None
+        self._write(user_id, apply)
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+    def _write(self, user_id: str, apply):
+        with self._lock:
+            if user_id in self._loading:
+                self._loading[user_id] = True
+        history = self._entries.peek(user_id)
+        if history is not None:
+            with history.lock:
+                apply(history)
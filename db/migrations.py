@@ -0,0 +1,70 @@
+#migrations.py
+# Usage: python -m db.migrations backfill_symptom_events
+import sys
+
+from sqlalchemy import select
+
+from db.postgres_adapter import (
+    init_db,
+    engine,
+    SessionLocal,
+    SymptomLog,
+    SymptomEvent,
+    symptom_events_for,
+)
+
+
+def create_indexes():
+    # create_all skips tables that already exist, so add their new indexes here
+    for index in SymptomLog.__table__.indexes | SymptomEvent.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def backfill_symptom_events(batch_size: int = 1000) -> int:
+    """Split the comma-joined symptom_logs.symptoms into symptom_events rows.
+
+    Safe to re-run: logs that already have events are skipped.
+    """
+    init_db()
+    create_indexes()
+    migrated = 0
+    last_id = 0
+    session = SessionLocal()
+    try:
+        while True:
+            logs = (
+                session.query(SymptomLog)
+                .filter(
+                    SymptomLog.id > last_id,
+                    ~SymptomLog.id.in_(select(SymptomEvent.log_id).where(SymptomEvent.log_id.isnot(None)))
+                )
+                .order_by(SymptomLog.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not logs:
+                break
+
+            for log in logs:
+                symptoms = [s for s in (log.symptoms or "").split(",") if s.strip()]
+                session.add_all(symptom_events_for(log, symptoms))
+            session.commit()
+
+            migrated += len(logs)
+            last_id = logs[-1].id
+            print(f"&&&&&[DB MIGRATION] backfilled {migrated} symptom logs")
+    finally:
+        session.close()
+    return migrated
+
+
+MIGRATIONS = {
+    "backfill_symptom_events": backfill_symptom_events,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in MIGRATIONS:
+        print(f"usage: python -m db.migrations [{'|'.join(MIGRATIONS)}]")
+        sys.exit(1)
+    MIGRATIONS[sys.argv[1]]()
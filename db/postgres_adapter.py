@@ -1,22 +1,35 @@
 #postgres_adapter.py
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text, DateTime
+from sqlalchemy import select, Column, Integer, String, Float, Text, DateTime, Index, case, cast, func, inspect, text, update, insert, and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from datetime import datetime, timedelta, timezone
+import asyncio
+import base64
 import os
+import threading
 from dotenv import load_dotenv
 from typing import List, Dict
 from shared.types import HealthBotState
+from shared.metrics import timed_db, atimed_db, Gauge, CACHE_REQUESTS, WRITE_BEHIND_DROPPED
+from db.engine import make_engine, make_async_engine
+from db.write_behind import WriteBehindBuffer
+from db.history_cache import HistoryCache, utc_naive
 
 load_dotenv()
 
-print("&&&&&[DB DEBUG] using POSTGRES_URL:", os.getenv("POSTGRES_URL"))
-
 Base = declarative_base()
 
 
-engine = create_engine(os.getenv("POSTGRES_URL"))
+# Pool sizing, pre-ping/recycle and the SQLite pragmas are set in db/engine.py.
+# DB_ASYNC=true also opens an async engine (asyncpg / aiosqlite) for the a* readers.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+engine = make_engine(os.getenv("POSTGRES_URL"))
 SessionLocal = sessionmaker(bind=engine)
+async_engine = make_async_engine(os.getenv("POSTGRES_URL")) if DB_ASYNC else None
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False) if async_engine else None
 
 # Table
 class SymptomLog(Base):
@@ -31,6 +44,20 @@ class SymptomLog(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     final_response = Column(Text)
 
+    __table_args__ = (Index("ix_symptom_logs_user_ts", "user_id", "timestamp"),)
+
+# One row per (log, symptom): frequency checks hit this index instead of ilike-scanning symptom_logs
+class SymptomEvent(Base):
+    __tablename__ = "symptom_events"
+
+    id = Column(Integer, primary_key=True)
+    log_id = Column(Integer)                # symptom_logs.id, lets the backfill skip migrated rows
+    user_id = Column(String, nullable=False)
+    symptom = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_symptom_events_user_symptom_ts", "user_id", "symptom", "timestamp"),)
+
 class ConversationLog(Base):
     __tablename__ = "conversation_logs"
 
@@ -38,132 +65,748 @@ class ConversationLog(Base):
     user_id = Column(String, index=True)
     message = Column(Text)             
     intents = Column(Text)             
+    intent_source = Column(String)     # "llm" or "local"; only LLM labels train the local classifier
     results = Column(Text)             
     timestamp = Column(DateTime, default=datetime.utcnow)
 
 
-Base.metadata.create_all(bind=engine)
+# Outbox: alerts are committed here first and sent by workers/alert_dispatcher.py
+class AlertOutbox(Base):
+    __tablename__ = "alert_outbox"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, nullable=False)
+    kind = Column(String, nullable=False)               # "emergency", "review" or "frequency"
+    dedup_key = Column(String, nullable=False, unique=True)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")   # pending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_alert_outbox_status_next", "status", "next_attempt_at"),)
+
+
+# create_all doesn't alter existing tables; add columns introduced after the first release
+def add_missing_columns():
+    columns = {c["name"] for c in inspect(engine).get_columns(ConversationLog.__tablename__)}
+    if "intent_source" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE conversation_logs ADD COLUMN intent_source VARCHAR"))
+        print("&&&&&[DB DEBUG] added conversation_logs.intent_source")
+
+
+_db_ready = False
+_db_init_lock = threading.Lock()
+
+
+def init_db():
+    """Create missing tables and columns. Idempotent; called from main.py's startup and the CLIs."""
+    global _db_ready
+    with _db_init_lock:
+        if not _db_ready:
+            Base.metadata.create_all(bind=engine)
+            add_missing_columns()
+            _db_ready = True
+
+# Windows (days) the frequency checks look at; fetched together in one query
+FREQUENCY_WINDOWS = (7, 30)
+
+
+def normalize_symptom(symptom: str) -> str:
+    return " ".join(str(symptom).lower().split())
+
+
+def symptom_event_rows(log_id: int, user_id: str, timestamp: datetime, symptoms: List[str]) -> List[dict]:
+    names = dict.fromkeys(normalize_symptom(s) for s in symptoms)
+    return [
+        {"log_id": log_id, "user_id": user_id, "symptom": name, "timestamp": timestamp}
+        for name in names if name
+    ]
+
+
+def symptom_events_for(log: SymptomLog, symptoms: List[str]) -> List[SymptomEvent]:
+    return [SymptomEvent(**row) for row in symptom_event_rows(log.id, log.user_id, log.timestamp, symptoms)]
+
 
 # Logging
-def log_symptom_interaction(state: HealthBotState):
+# Both log writes go through a write-behind buffer: rows are queued and committed
+# in multi-row batches off the request path. Reads for a user flush that user's
+# pending rows first, so the next request still sees them.
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() not in ("0", "false", "no")
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "100"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_FULL_WAIT = float(os.getenv("WRITE_BEHIND_FULL_WAIT", "5"))   # seconds a writer waits for room
+
+
+@timed_db
+def write_log_batch(items: List[tuple]):
+    """Insert queued (kind, user_id, record) items with one multi-row insert per table and one commit."""
+    symptom_records = [record for kind, _, record in items if kind == "symptom_log"]
+    conversation_rows = [record for kind, _, record in items if kind == "conversation"]
+    session = SessionLocal()
+    try:
+        if symptom_records:
+            ids = session.execute(
+                insert(SymptomLog).returning(SymptomLog.id, sort_by_parameter_order=True),
+                [r["log"] for r in symptom_records],
+            ).scalars().all()
+            events = [
+                row
+                for log_id, r in zip(ids, symptom_records)
+                for row in symptom_event_rows(log_id, r["log"]["user_id"], r["log"]["timestamp"], r["symptoms"])
+            ]
+            if events:
+                session.execute(insert(SymptomEvent), events)
+        if conversation_rows:
+            session.execute(insert(ConversationLog), conversation_rows)
+        session.commit()
+    finally:
+        session.close()
+
+
+write_buffer = WriteBehindBuffer(
+    write_log_batch,
+    max_batch=WRITE_BEHIND_MAX_BATCH,
+    interval=WRITE_BEHIND_FLUSH_INTERVAL,
+    max_pending=WRITE_BEHIND_MAX_PENDING,
+    full_wait=WRITE_BEHIND_FULL_WAIT,
+    on_drop=lambda kind: WRITE_BEHIND_DROPPED.inc(kind),
+)
+
+Gauge("healthbot_write_behind_pending", "Log rows waiting to be committed", func=lambda: {(): write_buffer.pending()})
+
+
+def _queue_write(kind: str, user_id: str, record: dict):
+    if WRITE_BEHIND_ENABLED:
+        write_buffer.add(kind, user_id, record)
+    else:
+        write_log_batch([(kind, user_id, record)])
+
+
+# History cache
+# Recent conversation pairs, symptom logs and the symptom events behind the
+# frequency windows, per user. The log writers below update it write-through.
+HISTORY_CACHE_ENABLED = os.getenv("HISTORY_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+HISTORY_CACHE_MAXSIZE = int(os.getenv("HISTORY_CACHE_MAXSIZE", "1000"))
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "300"))
+HISTORY_CACHE_DEPTH = int(os.getenv("HISTORY_CACHE_DEPTH", "20"))
+HISTORY_CACHE_MAX_EVENTS = int(os.getenv("HISTORY_CACHE_MAX_EVENTS", "500"))
+
+
+@timed_db
+def load_user_history(user_id: str, depth: int, event_days: int, max_events: int):
+    write_buffer.flush_user(user_id)
+    since = datetime.utcnow() - timedelta(days=event_days)
     session = SessionLocal()
-    log = SymptomLog(
-        user_id=state["user_id"],
-        query=state["messages"][-1].content,
-        symptoms=", ".join(state.get("symptoms") or []),
-        stress_level=state.get("stress_level"),
-        risk_score=state.get("risk_score"),
-        timestamp=datetime.now(timezone.utc),
-        final_response=state.get("response_message")
+    try:
+        conversations = (
+            session.query(ConversationLog.message, ConversationLog.results, ConversationLog.timestamp)
+            .filter(ConversationLog.user_id == user_id)
+            .order_by(ConversationLog.timestamp.desc())
+            .limit(depth)
+            .all()
+        )
+        logs = (
+            session.query(SymptomLog.query, SymptomLog.symptoms, SymptomLog.final_response, SymptomLog.timestamp)
+            .filter(SymptomLog.user_id == user_id)
+            .order_by(SymptomLog.timestamp.desc())
+            .limit(depth)
+            .all()
+        )
+        events = (
+            session.query(SymptomEvent.symptom, SymptomEvent.timestamp)
+            .filter(SymptomEvent.user_id == user_id, SymptomEvent.timestamp >= since)
+            .limit(max_events + 1)
+            .all()
+        )
+    finally:
+        session.close()
+
+    return (
+        [{"message": m, "results": r, "timestamp": ts} for m, r, ts in reversed(conversations)],
+        [{"query": q, "symptoms": s, "final_response": f, "timestamp": ts} for q, s, f, ts in reversed(logs)],
+        None if len(events) > max_events else [(s, ts) for s, ts in events],
     )
-    session.add(log)
-    session.commit()
-    session.close()
 
 
-def store_conversation(entry: dict):
+history_cache = HistoryCache(
+    load_user_history,
+    maxsize=HISTORY_CACHE_MAXSIZE,
+    ttl=HISTORY_CACHE_TTL,
+    depth=HISTORY_CACHE_DEPTH,
+    event_days=max(FREQUENCY_WINDOWS),
+    max_events=HISTORY_CACHE_MAX_EVENTS,
+)
+
+
+def _history_cacheable(limit: int = 0) -> bool:
+    return HISTORY_CACHE_ENABLED and limit <= HISTORY_CACHE_DEPTH
+
+
+def _cached_history(user_id: str, operation: str, limit: int = 0, load: bool = True):
+    """The user's cached history, or None when the cache is off or can't hold ``limit`` rows.
+
+    With ``load=False`` a miss returns None instead of reading the DB, so async
+    callers can serve hits on the event loop and send misses to a thread.
+    """
+    if not _history_cacheable(limit):
+        return None
+    if load:
+        history, hit = history_cache.get(user_id)
+    else:
+        history = history_cache.cached(user_id)
+        if history is None:
+            return None
+        hit = True
+    CACHE_REQUESTS.inc("history", operation, "hit" if hit else "miss")
+    return history
+
+
+def _read(user_id: str, stmt) -> list:
+    write_buffer.flush_user(user_id)
     session = SessionLocal()
-    log = ConversationLog(
-        user_id=entry.get("user_id"),
-        message=entry.get("inputs", {}).get("message", ""),
-        intents=", ".join(entry.get("intents", [])) if entry.get("intents") else "",
-        results=entry.get("results", {}).get("response", ""),
-        timestamp=datetime.now(timezone.utc),
+    try:
+        return session.execute(stmt).all()
+    finally:
+        session.close()
+
+
+async def _aread(user_id: str, stmt) -> list:
+    if write_buffer.needs_flush(user_id):
+        await asyncio.to_thread(write_buffer.flush_user, user_id)
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(stmt)).all()
+
+
+@timed_db
+def log_symptom_interaction(state: HealthBotState):
+    symptoms = list(state.get("symptoms") or [])
+    log = {
+        "user_id": state["user_id"],
+        "query": state["messages"][-1].content,
+        "symptoms": ", ".join(symptoms),
+        "stress_level": state.get("stress_level"),
+        "risk_score": state.get("risk_score"),
+        "timestamp": datetime.now(timezone.utc),
+        "final_response": state.get("response_message"),
+    }
+    _queue_write("symptom_log", state["user_id"], {"log": log, "symptoms": symptoms})
+    history_cache.add_symptom_log(
+        state["user_id"],
+        {"query": log["query"], "symptoms": log["symptoms"], "final_response": log["final_response"],
+         "timestamp": utc_naive(log["timestamp"])},
+        [row["symptom"] for row in symptom_event_rows(None, state["user_id"], log["timestamp"], symptoms)],
     )
-    session.add(log)
-    session.commit()
-    session.close()
 
-def get_memory_pairs(user_id: str, limit: int = 5) -> List[dict]:
-    session = SessionLocal()
-    logs = (
-        session.query(ConversationLog)
-        .filter(ConversationLog.user_id == user_id)
+
+@timed_db
+def store_conversation(entry: dict):
+    row = {
+        "user_id": entry.get("user_id"),
+        "message": entry.get("inputs", {}).get("message", ""),
+        "intents": ", ".join(entry.get("intents", [])) if entry.get("intents") else "",
+        "intent_source": entry.get("intent_source"),
+        "results": entry.get("results", {}).get("response", ""),
+        "timestamp": datetime.now(timezone.utc),
+    }
+    _queue_write("conversation", row["user_id"], row)
+    history_cache.add_conversation(row["user_id"], {
+        "message": row["message"], "results": row["results"], "timestamp": utc_naive(row["timestamp"]),
+    })
+
+
+def _memory_pair(message: str, results: str) -> dict:
+    return {"user": (message or "...").strip(), "ai": (results or "...").strip()}
+
+
+def _history_ui_row(symptoms: str, final_response: str, timestamp: datetime) -> dict:
+    return {
+        "symptoms":  symptoms,
+        "response":  final_response,
+        "timestamp": timestamp.strftime("%Y-%m-%d %H:%M UTC")
+    }
+
+# Each reader below builds a select() that the sync function runs on a pooled
+# session and its a* twin on the async engine (when DB_ASYNC is on).
+def _memory_pairs_stmt(user_id: str, limit: int):
+    return (
+        select(ConversationLog.message, ConversationLog.results)
+        .where(ConversationLog.user_id == user_id)
         .order_by(ConversationLog.timestamp.desc())
         .limit(limit)
-        .all()
     )
-    session.close()
 
-    results = []
-    for log in logs[::-1]: 
-        user_msg = log.message or "..."
-        ai_msg = log.results or "..."
-        results.append({"user": user_msg.strip(), "ai": ai_msg.strip()})
-    return results
 
+def _cached_memory_pairs(history, limit: int) -> List[dict]:
+    return [_memory_pair(r["message"], r["results"]) for r in history.recent(history.conversations, limit)]
+
+
+@timed_db
+def get_memory_pairs(user_id: str, limit: int = 5) -> List[dict]:
+    history = _cached_history(user_id, "get_memory_pairs", limit)
+    if history is not None:
+        return _cached_memory_pairs(history, limit)
+
+    logs = _read(user_id, _memory_pairs_stmt(user_id, limit))
+    return [_memory_pair(message, results) for message, results in logs[::-1]]
+
+
+
+def _recent_messages_stmt(user_id: str, limit: int):
+    return (
+        select(SymptomLog.query)
+        .where(SymptomLog.user_id == user_id)
+        .order_by(SymptomLog.timestamp.desc())
+        .limit(limit)
+    )
+
+
+def _cached_recent_messages(history, limit: int) -> List[str]:
+    return [r["query"] for r in reversed(history.recent(history.symptom_logs, limit))]
 
 
+@timed_db
 def get_recent_messages(user_id: str, limit: int = 5) -> List[str]:
-    session = SessionLocal()
-    logs = session.query(SymptomLog).filter(
-        SymptomLog.user_id == user_id
-    ).order_by(SymptomLog.timestamp.desc()).limit(limit).all()
-    session.close()
-    return [log.query for log in logs] 
+    history = _cached_history(user_id, "get_recent_messages", limit)
+    if history is not None:
+        return _cached_recent_messages(history, limit)
+
+    return [query for query, in _read(user_id, _recent_messages_stmt(user_id, limit))]
 
 # For Streamlit UI 
+def _history_ui_stmt(user_id: str, limit: int):
+    return (
+        select(SymptomLog.symptoms, SymptomLog.final_response, SymptomLog.timestamp)
+        .where(SymptomLog.user_id == user_id)
+        .order_by(SymptomLog.timestamp.desc())
+        .limit(limit)
+    )
+
+
+def _cached_history_ui(history, limit: int) -> List[dict]:
+    return [
+        _history_ui_row(r["symptoms"], r["final_response"], r["timestamp"])
+        for r in reversed(history.recent(history.symptom_logs, limit))
+    ]
+
+
+@timed_db
 def get_message_history_ui(user_id: str, limit: int = 10) -> List[dict]:
+    history = _cached_history(user_id, "get_message_history_ui", limit)
+    if history is not None:
+        return _cached_history_ui(history, limit)
+
+    return [_history_ui_row(*row) for row in _read(user_id, _history_ui_stmt(user_id, limit))]
+
+
+# Paginated history and export
+# Pages are keyset-paginated on (timestamp, id), newest first: the cursor is the
+# last row of the previous page, so page N costs the same as page 1.
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "100"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = f"{utc_naive(timestamp).isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """(timestamp, id) from encode_cursor(); ValueError if it isn't one."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise ValueError(f"invalid history cursor: {cursor!r}")
+
+
+def _history_page_stmt(user_id: str, limit: int, cursor: str = None):
+    stmt = select(
+        SymptomLog.id, SymptomLog.symptoms, SymptomLog.final_response, SymptomLog.timestamp
+    ).where(SymptomLog.user_id == user_id)
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            SymptomLog.timestamp < ts,
+            and_(SymptomLog.timestamp == ts, SymptomLog.id < row_id),
+        ))
+    # one extra row tells us whether there's a next page
+    return stmt.order_by(SymptomLog.timestamp.desc(), SymptomLog.id.desc()).limit(limit + 1)
+
+
+def _history_page(logs: list, limit: int):
+    next_cursor = encode_cursor(logs[limit - 1].timestamp, logs[limit - 1].id) if len(logs) > limit else None
+    return [_history_ui_row(log.symptoms, log.final_response, log.timestamp) for log in logs[:limit]], next_cursor
+
+
+@timed_db
+def get_message_history_page(user_id: str, limit: int = 10, cursor: str = None):
+    """One page of history rows, newest first, and the cursor for the next page (None at the end)."""
+    limit = max(1, min(limit, HISTORY_PAGE_MAX))
+    return _history_page(_read(user_id, _history_page_stmt(user_id, limit, cursor)), limit)
+
+
+def _export_row(log: SymptomLog) -> dict:
+    return {
+        "id": log.id,
+        "query": log.query,
+        "symptoms": log.symptoms,
+        "stress_level": log.stress_level,
+        "risk_score": log.risk_score,
+        "response": log.final_response,
+        "ts": log.timestamp.isoformat(),
+    }
+
+
+def iter_symptom_logs(user_id: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """Every symptom log of the user, oldest first, as export dicts.
+
+    Rows come through a server-side cursor ``batch_size`` at a time, so memory stays
+    flat however long the user's record is. The session lives until the generator
+    is exhausted or closed.
+    """
+    write_buffer.flush_user(user_id)
     session = SessionLocal()
-    logs = (
-      session
-      .query(SymptomLog)
-      .filter(SymptomLog.user_id == user_id)
-      .order_by(SymptomLog.timestamp.desc())  
-      .limit(limit)
-      .all()
+    try:
+        logs = (
+            session
+            .query(SymptomLog)
+            .filter(SymptomLog.user_id == user_id)
+            .order_by(SymptomLog.timestamp.asc(), SymptomLog.id.asc())
+            .yield_per(batch_size)
+        )
+        for log in logs:
+            yield _export_row(log)
+    finally:
+        session.close()
+
+
+
+# Frequency
+def _frequency_request(symptoms: List[str], windows):
+    result = {days: {s: 0 for s in symptoms} for days in windows}
+    by_name = {}
+    for s in symptoms:
+        by_name.setdefault(normalize_symptom(s), []).append(s)
+    now = datetime.utcnow()
+    cutoffs = {days: now - timedelta(days=days) for days in windows}
+    return result, by_name, cutoffs
+
+
+def _fill_cached_frequencies(history, result: dict, by_name: dict, cutoffs: dict) -> bool:
+    counts = history.count_events(list(by_name), cutoffs) if history is not None else None
+    if counts is None:
+        return False
+    for days, per_name in counts.items():
+        for name, count in per_name.items():
+            for original in by_name[name]:
+                result[days][original] = count
+    return True
+
+
+def _frequency_stmt(user_id: str, by_name: dict, cutoffs: dict):
+    return (
+        select(
+            SymptomEvent.symptom,
+            *[func.sum(case((SymptomEvent.timestamp >= cutoff, 1), else_=0)) for cutoff in cutoffs.values()]
+        )
+        .where(
+            SymptomEvent.user_id == user_id,
+            SymptomEvent.symptom.in_(list(by_name)),
+            SymptomEvent.timestamp >= min(cutoffs.values())
+        )
+        .group_by(SymptomEvent.symptom)
     )
-    session.close()
 
-   
-    return [{
-        "symptoms":  log.symptoms,
-        "response":  log.final_response,
-        "timestamp": log.timestamp.strftime("%Y-%m-%d %H:%M UTC")
-    } for log in logs]
 
+def _fill_frequency_rows(rows: list, result: dict, by_name: dict, cutoffs: dict):
+    for name, *counts in rows:
+        for days, count in zip(cutoffs, counts):
+            for original in by_name.get(name, []):
+                result[days][original] = int(count or 0)
 
 
-# Frequency
-def get_symptom_frequencies(user_id: str, symptoms: List[str], days: int = 7) -> Dict[str, int]:
-    session = SessionLocal()
-    freq_map = {}
-    recent_time = datetime.utcnow() - timedelta(days=days)
+@timed_db
+def get_symptom_frequency_windows(user_id: str, symptoms: List[str], windows=FREQUENCY_WINDOWS) -> Dict[int, Dict[str, int]]:
+    """Counts per symptom for every window (days) with a single grouped query."""
+    result, by_name, cutoffs = _frequency_request(symptoms, windows)
+    if not by_name or not windows:
+        return result
 
-    for symptom in symptoms:
-        count = session.query(SymptomLog).filter(
-            SymptomLog.user_id == user_id,
-            SymptomLog.symptoms.ilike(f"%{symptom}%"),
-            SymptomLog.timestamp >= recent_time
-        ).count()
-        freq_map[symptom] = count
+    history = _cached_history(user_id, "get_symptom_frequency_windows")
+    if _fill_cached_frequencies(history, result, by_name, cutoffs):
+        return result
 
-    session.close()
-    return freq_map
+    _fill_frequency_rows(_read(user_id, _frequency_stmt(user_id, by_name, cutoffs)), result, by_name, cutoffs)
+    return result
 
 
+@timed_db
+def get_symptom_frequencies(user_id: str, symptoms: List[str], days: int = 7) -> Dict[str, int]:
+    return get_symptom_frequency_windows(user_id, symptoms, windows=(days,))[days]
 
-def db_handler_node(state: HealthBotState) -> HealthBotState:
-    import os
-    from datetime import datetime
-    print("&&&&&[DB DEBUG] db_handler_node invoked")
-    print("&&&&&[DB DEBUG] POSTGRES_URL:", os.getenv("POSTGRES_URL"))
-    print(f"&&&&&[DB DEBUG] incoming state.timestamp = {state.get('timestamp')}")
 
-    #timestamp
-    if not state.get("timestamp"):
-        state["timestamp"] = datetime.utcnow().isoformat()
-        print(f"&&&&&[DB DEBUG] timestamp was missing, set to {state['timestamp']}")
 
-    # frequency 
-    freq_map = get_symptom_frequencies(state["user_id"], state.get("symptoms", []))
+FREQUENT_SYMPTOM_WARNING = "This symptom has occurred frequently. Please consult a doctor."
+
+
+# Partial update for db_handler_node: the warning goes to `warnings`, which
+# final_summary appends to the reply (response_message is keep_first, so
+# appending to it here never reached the merged state)
+def _db_handler_update(state: HealthBotState, freq_map: dict) -> dict:
+    update = {}
+    if not state.get("timestamp"):
+        update["timestamp"] = datetime.utcnow().isoformat()
+        print(f"&&&&&[DB DEBUG] timestamp was missing, set to {update['timestamp']}")
     if any(c >= 3 for c in freq_map.values()):
-        state["response_message"] += "  This symptom has occurred frequently. Please consult a doctor."
+        update["warnings"] = [FREQUENT_SYMPTOM_WARNING]
         print("&&&&&[DB DEBUG] emergency appended for", freq_map)
+    return update
+
+
+def db_handler_node(state: HealthBotState) -> dict:
+    print("&&&&&[DB DEBUG] db_handler_node invoked")
+    print(f"&&&&&[DB DEBUG] incoming state.timestamp = {state.get('timestamp')}")
+
+    # frequency (emergency_alert usually fetched it already)
+    freq_map = (state.get("_symptom_frequencies") or {}).get(7)
+    if freq_map is None:
+        freq_map = get_symptom_frequencies(state["user_id"], state.get("symptoms", []))
+    update = _db_handler_update(state, freq_map)
 
     # now log
     print(f"&&&&&[DB DEBUG] calling log_symptom_interaction(...)")
-    log_symptom_interaction(state)
+    log_symptom_interaction({**state, **update})
     print("&&&&&[DB DEBUG] log_symptom_interaction returned")
-    return state
+    return update
+
+
+# Alert outbox
+ALERT_DEDUP_WINDOW_MINUTES = int(os.getenv("ALERT_DEDUP_WINDOW_MINUTES", "30"))
+
+
+def alert_dedup_key(user_id: str, kind: str) -> str:
+    return f"{kind}:{user_id}"
+
+
+# Sliding window: the newest alert of a (kind, user) holds the bare dedup key.
+# Enqueueing first retires the holder if it is older than the window or was
+# given up on (its key gets its id appended), then inserts. What deduplicates is
+# the unique index on dedup_key: while a holder is inside the window, or when
+# two enqueues race, only one insert of the bare key can succeed and the other
+# gets an IntegrityError. A failed holder never suppresses a new alert.
+@timed_db
+def enqueue_alert(user_id: str, kind: str, body: str, window_minutes: int = ALERT_DEDUP_WINDOW_MINUTES) -> bool:
+    """Queue an alert; False if this user had one of this kind queued within the window."""
+    key = alert_dedup_key(user_id, kind)
+    cutoff = datetime.utcnow() - timedelta(minutes=window_minutes)
+    session = SessionLocal()
+    try:
+        session.execute(
+            update(AlertOutbox)
+            .where(AlertOutbox.dedup_key == key, or_(AlertOutbox.created_at <= cutoff, AlertOutbox.status == "failed"))
+            .values(dedup_key=AlertOutbox.dedup_key + ":" + cast(AlertOutbox.id, String))
+        )
+        session.add(AlertOutbox(user_id=user_id, kind=kind, dedup_key=key, body=body))
+        session.commit()
+        return True
+    except IntegrityError:
+        session.rollback()
+        return False
+    finally:
+        session.close()
+
+
+@timed_db
+def claim_due_alerts(limit: int, lease_seconds: float) -> List[dict]:
+    """Take up to ``limit`` due alerts and push their next attempt past the lease.
+
+    A dispatcher that dies mid-send leaves them to be retried once the lease runs
+    out; on Postgres, SKIP LOCKED keeps concurrent dispatchers off the same rows.
+    """
+    now = datetime.utcnow()
+    session = SessionLocal()
+    try:
+        rows = (
+            session.query(AlertOutbox)
+            .filter(AlertOutbox.status == "pending", AlertOutbox.next_attempt_at <= now)
+            .order_by(AlertOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        claimed = []
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = now + timedelta(seconds=lease_seconds)
+            claimed.append({"id": row.id, "user_id": row.user_id, "kind": row.kind,
+                            "body": row.body, "attempts": row.attempts, "created_at": row.created_at})
+        session.commit()
+        return claimed
+    finally:
+        session.close()
+
+
+@timed_db
+def mark_alerts_sent(ids: List[int]):
+    if not ids:
+        return
+    session = SessionLocal()
+    try:
+        session.execute(
+            update(AlertOutbox)
+            .where(AlertOutbox.id.in_(ids))
+            .values(status="sent", sent_at=datetime.utcnow(), last_error=None)
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+@timed_db
+def mark_alerts_failed(ids: List[int], error: str, retry_at: datetime = None):
+    """Record a failed send; with no ``retry_at`` the alerts are given up on."""
+    if not ids:
+        return
+    values = {"last_error": error[:2000]}
+    if retry_at is None:
+        values["status"] = "failed"
+    else:
+        values["next_attempt_at"] = retry_at
+    session = SessionLocal()
+    try:
+        session.execute(update(AlertOutbox).where(AlertOutbox.id.in_(ids)).values(**values))
+        session.commit()
+    finally:
+        session.close()
+
+
+@timed_db
+def release_alerts(ids: List[int]):
+    """Hand claimed alerts back unsent: due again now, and the claim's attempt doesn't count."""
+    if not ids:
+        return
+    session = SessionLocal()
+    try:
+        session.execute(
+            update(AlertOutbox)
+            .where(AlertOutbox.id.in_(ids), AlertOutbox.status == "pending")
+            .values(attempts=AlertOutbox.attempts - 1, next_attempt_at=datetime.utcnow())
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+@timed_db
+def count_alerts_by_status() -> Dict[str, int]:
+    session = SessionLocal()
+    try:
+        rows = session.query(AlertOutbox.status, func.count(AlertOutbox.id)).group_by(AlertOutbox.status).all()
+    finally:
+        session.close()
+    return {status: count for status, count in rows}
+
+
+# Async access
+# Cached history is served on the event loop. Reads the cache doesn't cover use
+# the async engine when DB_ASYNC is on; everything else (writes, cache loads,
+# sync-only engines) runs the sync function in a worker thread.
+def _async_db(limit: int = 0) -> bool:
+    # cache-sized reads go through the sync path on a miss: it loads the entry
+    return async_engine is not None and not _history_cacheable(limit)
+
+
+async def alog_symptom_interaction(state: HealthBotState):
+    await asyncio.to_thread(log_symptom_interaction, state)
+
+
+async def astore_conversation(entry: dict):
+    await asyncio.to_thread(store_conversation, entry)
+
+
+@atimed_db
+async def aget_memory_pairs(user_id: str, limit: int = 5) -> List[dict]:
+    history = _cached_history(user_id, "get_memory_pairs", limit, load=False)
+    if history is not None:
+        return _cached_memory_pairs(history, limit)
+    if not _async_db(limit):
+        return await asyncio.to_thread(get_memory_pairs, user_id, limit)
+    logs = await _aread(user_id, _memory_pairs_stmt(user_id, limit))
+    return [_memory_pair(message, results) for message, results in logs[::-1]]
+
+
+@atimed_db
+async def aget_recent_messages(user_id: str, limit: int = 5) -> List[str]:
+    history = _cached_history(user_id, "get_recent_messages", limit, load=False)
+    if history is not None:
+        return _cached_recent_messages(history, limit)
+    if not _async_db(limit):
+        return await asyncio.to_thread(get_recent_messages, user_id, limit)
+    return [query for query, in await _aread(user_id, _recent_messages_stmt(user_id, limit))]
+
+
+@atimed_db
+async def aget_message_history_ui(user_id: str, limit: int = 10) -> List[dict]:
+    history = _cached_history(user_id, "get_message_history_ui", limit, load=False)
+    if history is not None:
+        return _cached_history_ui(history, limit)
+    if not _async_db(limit):
+        return await asyncio.to_thread(get_message_history_ui, user_id, limit)
+    return [_history_ui_row(*row) for row in await _aread(user_id, _history_ui_stmt(user_id, limit))]
+
+
+@atimed_db
+async def aget_message_history_page(user_id: str, limit: int = 10, cursor: str = None):
+    if async_engine is None:
+        return await asyncio.to_thread(get_message_history_page, user_id, limit, cursor)
+    limit = max(1, min(limit, HISTORY_PAGE_MAX))
+    return _history_page(await _aread(user_id, _history_page_stmt(user_id, limit, cursor)), limit)
+
+
+@atimed_db
+async def aget_symptom_frequencies(user_id: str, symptoms: List[str], days: int = 7) -> Dict[str, int]:
+    return (await aget_symptom_frequency_windows(user_id, symptoms, windows=(days,)))[days]
+
+
+async def aenqueue_alert(user_id: str, kind: str, body: str) -> bool:
+    return await asyncio.to_thread(enqueue_alert, user_id, kind, body)
+
+
+@atimed_db
+async def aget_symptom_frequency_windows(user_id: str, symptoms: List[str], windows=FREQUENCY_WINDOWS) -> Dict[int, Dict[str, int]]:
+    result, by_name, cutoffs = _frequency_request(symptoms, windows)
+    if not by_name or not windows:
+        return result
+
+    history = _cached_history(user_id, "get_symptom_frequency_windows", load=False)
+    if _fill_cached_frequencies(history, result, by_name, cutoffs):
+        return result
+    if async_engine is None or (history is None and _history_cacheable()):
+        return await asyncio.to_thread(get_symptom_frequency_windows, user_id, symptoms, windows)
+
+    rows = await _aread(user_id, _frequency_stmt(user_id, by_name, cutoffs))
+    _fill_frequency_rows(rows, result, by_name, cutoffs)
+    return result
+
+
+async def adispose_engines():
+    if async_engine is not None:
+        await async_engine.dispose()
+    await asyncio.to_thread(engine.dispose)
+
+
+async def adb_handler_node(state: HealthBotState) -> dict:
+    freq_map = (state.get("_symptom_frequencies") or {}).get(7)
+    if freq_map is None:
+        freq_map = await aget_symptom_frequencies(state["user_id"], state.get("symptoms", []))
+    update = _db_handler_update(state, freq_map)
+
+    await alog_symptom_interaction({**state, **update})
+    return update
 
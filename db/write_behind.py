@@ -0,0 +1,166 @@
+# db/write_behind.py
+# Write-behind buffer: log writes are queued in memory and committed in batches
+# by a background thread, so the chat path never waits on a commit. Readers
+# call flush_user() first, which keeps read-your-writes for that user.
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+
+class WriteBehindBuffer:
+    """Batches (kind, user_id, record) items and hands them to ``flush_func(items)``.
+
+    Flushes when ``max_batch`` items are pending or ``interval`` seconds after the
+    oldest one was queued, and on close(). A failed flush keeps the items for the
+    next attempt. With ``max_pending`` items queued, add() waits up to ``full_wait``
+    seconds for room, then writes its item through; if that fails too the item is
+    dropped, ``on_drop(kind)`` is called and the error is raised to the caller.
+    """
+
+    def __init__(self, flush_func, max_batch: int = 100, interval: float = 0.5, max_pending: int = 10000,
+                 full_wait: float = 5.0, on_drop=None):
+        self.flush_func = flush_func
+        self.max_batch = max_batch
+        self.interval = interval
+        self.max_pending = max_pending
+        self.full_wait = full_wait
+        self.on_drop = on_drop
+        self._items = []
+        self._by_user = defaultdict(int)
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()   # one flush at a time, readers wait for in-flight ones
+        self._thread = None
+        self._closed = False
+        self.flushes = 0
+        self.flushed_items = 0
+        self.dropped = 0
+
+    def add(self, kind: str, user_id: str, record: dict):
+        with self._cond:
+            # backpressure: a full buffer holds the writer until the flush thread makes room
+            give_up = time.monotonic() + self.full_wait
+            while not self._closed and len(self._items) >= self.max_pending:
+                self._ensure_thread()
+                self._cond.notify_all()
+                wait = give_up - time.monotonic()
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+            queued = not self._closed and len(self._items) < self.max_pending
+            if queued:
+                self._items.append((kind, user_id, record))
+                self._by_user[user_id] += 1
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+                self._ensure_thread()
+                if len(self._items) >= self.max_batch:
+                    self._cond.notify_all()
+        if not queued:
+            # shutting down, or the DB isn't keeping up: write this one through
+            self._write_through(kind, user_id, record)
+
+    def _write_through(self, kind: str, user_id: str, record: dict):
+        try:
+            self.flush_func([(kind, user_id, record)])
+        except Exception as e:
+            with self._cond:
+                self.dropped += 1
+            if self.on_drop:
+                self.on_drop(kind)
+            print(f"&&&&&[DB WRITE-BEHIND] buffer full and write-through failed, {kind} record for {user_id} lost: {e}")
+            raise
+
+    def pending(self, user_id: str = None) -> int:
+        with self._cond:
+            return len(self._items) if user_id is None else self._by_user.get(user_id, 0)
+
+    def needs_flush(self, user_id: str) -> bool:
+        """Whether flush_user(user_id) would have anything to commit or wait for."""
+        return self.pending(user_id) > 0 or self._flush_lock.locked()
+
+    def flush(self) -> int:
+        """Commit everything queued so far, in batches of ``max_batch``."""
+        flushed = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = self._items[:self.max_batch]
+                if not batch:
+                    return flushed
+                try:
+                    self.flush_func(batch)
+                except Exception as e:
+                    print(f"&&&&&[DB WRITE-BEHIND] flush of {len(batch)} records failed: {e}")
+                    raise
+                with self._cond:
+                    del self._items[:len(batch)]
+                    for _, user_id, _ in batch:
+                        self._by_user[user_id] -= 1
+                        if self._by_user[user_id] <= 0:
+                            del self._by_user[user_id]
+                    self._oldest = time.monotonic() if self._items else None
+                    self.flushes += 1
+                    self.flushed_items += len(batch)
+                    self._cond.notify_all()   # writers waiting for room
+                flushed += len(batch)
+
+    def flush_user(self, user_id: str):
+        # the in-flight batch may hold this user's rows, so wait for it even if nothing is queued
+        if self.pending(user_id):
+            try:
+                self.flush()
+            except Exception:
+                pass  # already logged; the read just won't see the unflushed rows
+        elif self._flush_lock.locked():
+            with self._flush_lock:
+                pass
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._items),
+                "flushes": self.flushes,
+                "flushed_items": self.flushed_items,
+                "dropped": self.dropped,
+            }
+
+    # Internals (called with self._cond held)
+    def _ensure_thread(self):
+        if self._thread is None:
+            atexit.register(self.close)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._items) >= self.max_batch:
+                        break
+                    if self._oldest is not None:
+                        wait = self._oldest + self.interval - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.interval)  # keep the items, try again later
@@ -1,13 +1,50 @@
 #main.py
 # main.py
-from fastapi import FastAPI, Request
-from api.routes import router
-from fastapi.middleware.cors import CORSMiddleware
-from db.postgres_adapter import get_recent_messages
-from fastapi.middleware.cors import CORSMiddleware
-from db.postgres_adapter import get_message_history_ui
+# Imports and startup steps are timed into shared/startup.py's report. Clients
+# (LLM, Tavily, Twilio) are built on first use; the DB schema check and the
+# graph build run once in the lifespan, before traffic is accepted.
+from shared.startup import startup_step, print_startup_report
+with startup_step("import fastapi"):
+    from fastapi import FastAPI, HTTPException, Query, Request
+    from fastapi.responses import PlainTextResponse
+    from fastapi.middleware.cors import CORSMiddleware
+with startup_step("import db"):
+    from db.postgres_adapter import init_db, aget_message_history_page, write_buffer, adispose_engines, HISTORY_PAGE_MAX
+with startup_step("import api.routes"):
+    from api.routes import router, get_graph
+with startup_step("import workers"):
+    from workers.alert_dispatcher import start_dispatcher, stop_dispatcher
+    from workers.memory_jobs import start_memory_workers, stop_memory_workers
+from typing import Optional
+from contextlib import asynccontextmanager
+from shared.llm_provider import aclose_llm_clients
+from shared import metrics
+import asyncio
+import os
 
-app = FastAPI(title="HealthBot API")
+# false: accept traffic right away and build the graph on the first request
+WARM_GRAPH_ON_STARTUP = os.getenv("WARM_GRAPH_ON_STARTUP", "true").lower() not in ("0", "false", "no")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_step("init_db"):
+        await asyncio.to_thread(init_db)
+    if WARM_GRAPH_ON_STARTUP:
+        with startup_step("build graph"):
+            await asyncio.to_thread(get_graph)
+    print_startup_report()
+    start_dispatcher()
+    start_memory_workers()
+    yield
+    await stop_memory_workers()  # before the write buffer closes: jobs still store rows
+    await stop_dispatcher()
+    await asyncio.to_thread(write_buffer.close)  # commit queued log rows
+    await adispose_engines()
+    await aclose_llm_clients()
+
+
+app = FastAPI(title="HealthBot API", lifespan=lifespan)
 
 
 app.add_middleware(
@@ -19,9 +56,16 @@ app.add_middleware(
 )
 
 @app.get("/history/{user_id}")
-def fetch_history(user_id: str):
-    messages = get_message_history_ui(user_id, limit=10)
-    return {"history": messages}
+async def fetch_history(user_id: str, limit: int = Query(10, ge=1, le=HISTORY_PAGE_MAX), cursor: Optional[str] = None):
+    try:
+        messages, next_cursor = await aget_message_history_page(user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"history": messages, "next_cursor": next_cursor}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 # Include routess
 app.include_router(router)
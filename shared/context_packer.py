@@ -0,0 +1,202 @@
+# shared/context_packer.py
+# Fits prompt context into a token budget. Each section is a list of items in
+# priority order; when everything doesn't fit, the budget is shared out so
+# small sections stay whole and large ones are cut from the bottom (the last
+# item that fits partially is truncated). Tokens are counted locally.
+#
+# tiktoken is only used when its encoding file is already in the local cache, so
+# counting never touches the network. To fetch it once (or point
+# TIKTOKEN_CACHE_DIR at a copy shipped with the image):
+#
+#   python -m shared.context_packer download
+import hashlib
+import math
+import os
+import re
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# without a cached encoding, or with CONTEXT_TOKENIZER=approx, tokens are estimated at ~4 chars each
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "tiktoken")
+CONTEXT_ENCODING = os.getenv("CONTEXT_ENCODING", "cl100k_base")
+TIKTOKEN_BLOB_URL = "https://openaipublic.blob.core.windows.net/encodings/{encoding}.tiktoken"
+CHARS_PER_TOKEN = 4
+MIN_TRUNCATED_TOKENS = 16   # a shorter tail isn't worth keeping
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def tiktoken_cache_path(encoding: str = CONTEXT_ENCODING):
+    """Where tiktoken caches ``encoding`` (same lookup as tiktoken.load), or None if caching is off."""
+    cache_dir = os.environ.get("TIKTOKEN_CACHE_DIR", os.environ.get("DATA_GYM_CACHE_DIR"))
+    if cache_dir is None:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return None
+    key = hashlib.sha1(TIKTOKEN_BLOB_URL.format(encoding=encoding).encode()).hexdigest()
+    return os.path.join(cache_dir, key)
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    with _encoding_lock:
+        if not _encoding_loaded:
+            if CONTEXT_TOKENIZER == "tiktoken":
+                path = tiktoken_cache_path()
+                if path and os.path.exists(path):
+                    try:
+                        import tiktoken
+                        _encoding = tiktoken.get_encoding(CONTEXT_ENCODING)
+                    except Exception as e:
+                        print(f"[Context Packer] tiktoken unavailable, estimating tokens: {e}")
+                else:
+                    print(f"[Context Packer] {CONTEXT_ENCODING} not cached locally, estimating tokens "
+                          "(python -m shared.context_packer download)")
+            _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        cut = encoding.decode(tokens[:max_tokens])
+    else:
+        if len(text) <= max_tokens * CHARS_PER_TOKEN:
+            return text
+        cut = text[:max_tokens * CHARS_PER_TOKEN]
+    # end on a word boundary
+    space = cut.rfind(" ")
+    return (cut[:space] if space > len(cut) // 2 else cut).rstrip() + " …"
+
+
+@dataclass
+class Section:
+    name: str
+    items: List[str]            # highest priority first
+    separator: str = "\n"
+
+
+@dataclass
+class PackedSection:
+    name: str
+    items: List[str] = field(default_factory=list)
+    separator: str = "\n"
+    tokens: int = 0
+    full_tokens: int = 0
+    dropped: int = 0
+    truncated: bool = False
+
+    @property
+    def text(self) -> str:
+        return self.separator.join(self.items)
+
+
+def _allot(needs: Dict[str, int], budget: int) -> Dict[str, int]:
+    """Water-filling: sections needing less than an equal share keep all of it."""
+    allotment = {}
+    pending = dict(needs)
+    remaining = budget
+    while pending:
+        share = remaining // len(pending)
+        small = {name: need for name, need in pending.items() if need <= share}
+        if not small:
+            for name in pending:
+                allotment[name] = share
+            break
+        for name, need in small.items():
+            allotment[name] = need
+            remaining -= need
+            del pending[name]
+    return allotment
+
+
+def pack(sections: List[Section], budget: int) -> Dict[str, PackedSection]:
+    """Packed sections by name, in the order given, using at most ``budget`` tokens."""
+    costs = {s.name: [count_tokens(item) for item in s.items] for s in sections}
+    needs = {name: sum(c) for name, c in costs.items()}
+    allotment = needs if sum(needs.values()) <= budget else _allot(needs, budget)
+
+    packed = {}
+    for section in sections:
+        result = PackedSection(section.name, separator=section.separator, full_tokens=needs[section.name])
+        left = allotment[section.name]
+        for item, cost in zip(section.items, costs[section.name]):
+            if cost <= left:
+                result.items.append(item)
+                left -= cost
+            elif left >= MIN_TRUNCATED_TOKENS and not result.truncated:
+                cut = truncate_to_tokens(item, left - 2)   # room for the ellipsis
+                result.items.append(cut)
+                left -= count_tokens(cut)
+                result.truncated = True
+            else:
+                result.dropped += 1
+        result.tokens = allotment[section.name] - left
+        packed[section.name] = result
+    return packed
+
+
+def normalize_line(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def dedupe(items: List[str]) -> List[str]:
+    seen = set()
+    unique = []
+    for item in items:
+        key = normalize_line(item)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+
+def rank_by_overlap(items: List[str], query: str) -> List[str]:
+    """Items sharing the most words with ``query`` first; ties keep their order."""
+    terms = {w for w in normalize_line(query).split() if len(w) > 2}
+    if not terms:
+        return list(items)
+    scored = [(-len(terms & set(normalize_line(item).split())), i, item) for i, item in enumerate(items)]
+    return [item for _, _, item in sorted(scored)]
+
+
+def report(packed: Dict[str, PackedSection]) -> str:
+    return ", ".join(
+        f"{p.name}={p.tokens}/{p.full_tokens}"
+        + (f" (-{p.dropped})" if p.dropped else "")
+        + (" (cut)" if p.truncated else "")
+        for p in packed.values()
+    )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["download"]:
+        raise SystemExit("usage: python -m shared.context_packer download")
+    import tiktoken
+    tiktoken.get_encoding(CONTEXT_ENCODING)   # fetches into the cache
+    print(f"[Context Packer] {CONTEXT_ENCODING} cached at {tiktoken_cache_path()}")
@@ -0,0 +1,83 @@
+# shared/llm_cache.py
+# Response cache for agent prompts that are pure functions of small inputs.
+# The backend is pluggable: anything with get(key) / set(key, value) works.
+import os
+import threading
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+from shared.cache import TTLCache, normalize_text
+from shared.metrics import CACHE_REQUESTS
+
+load_dotenv()
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "21600"))
+LLM_CACHE_MAXSIZE = int(os.getenv("LLM_CACHE_MAXSIZE", "2048"))
+# comma-separated agent names to bypass the cache, or "all"
+LLM_CACHE_DISABLED = {
+    a.strip() for a in os.getenv("LLM_CACHE_DISABLED_AGENTS", "").split(",") if a.strip()
+}
+
+_cache = TTLCache(maxsize=LLM_CACHE_MAXSIZE, ttl=LLM_CACHE_TTL)
+_lock = threading.Lock()
+_agent_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def set_response_cache(cache):
+    global _cache
+    _cache = cache
+
+
+def cache_enabled(agent: str) -> bool:
+    return "all" not in LLM_CACHE_DISABLED and agent not in LLM_CACHE_DISABLED
+
+
+def prompt_key(text: str) -> str:
+    return normalize_text(text)
+
+
+def symptoms_key(symptoms) -> str:
+    # order and case of symptoms don't change the remedy prompt's meaning
+    return ", ".join(sorted({normalize_text(s) for s in symptoms if normalize_text(s)}))
+
+
+def _lookup(agent: str, key: str):
+    value = _cache.get((agent, key))
+    CACHE_REQUESTS.inc("llm", agent, "hit" if value is not None else "miss")
+    with _lock:
+        _agent_stats[agent]["hits" if value is not None else "misses"] += 1
+    return value
+
+
+def _store(agent: str, key: str, value):
+    if value:
+        _cache.set((agent, key), value)
+
+
+def cached_response(agent: str, key: str, compute):
+    """Return the cached text for (agent, key) or call ``compute()`` and cache it."""
+    if not cache_enabled(agent):
+        return compute()
+    value = _lookup(agent, key)
+    if value is None:
+        value = compute()
+        _store(agent, key, value)
+    return value
+
+
+async def acached_response(agent: str, key: str, acompute):
+    if not cache_enabled(agent):
+        return await acompute()
+    value = _lookup(agent, key)
+    if value is None:
+        value = await acompute()
+        _store(agent, key, value)
+    return value
+
+
+def get_cache_stats() -> dict:
+    with _lock:
+        agents = {agent: dict(stats) for agent, stats in _agent_stats.items()}
+    stats = _cache.stats() if hasattr(_cache, "stats") else {}
+    return {**stats, "agents": agents}
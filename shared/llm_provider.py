@@ -0,0 +1,241 @@
+# shared/llm_provider.py
+# One place to build chat models: every agent shares the same keep-alive HTTP pool,
+# a global cap on in-flight LLM requests and per-model usage counters.
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict
+
+import httpx
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_openai import ChatOpenAI
+
+from shared.metrics import LLM_CALLS, LLM_SECONDS, LLM_TOKENS
+from shared.resilience import openrouter_breaker
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "mistralai/mistral-7b-instruct")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+
+# Concurrency limit
+# Sync calls share one semaphore across threads; async calls get one per event loop.
+_sync_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_async_slots = weakref.WeakKeyDictionary()
+# set while a call holds a slot, so _generate -> _stream inside one call doesn't take two
+_holding_slot: ContextVar[bool] = ContextVar("llm_holding_slot", default=False)
+
+
+@contextmanager
+def _sync_slot():
+    if _holding_slot.get():
+        yield
+        return
+    with _sync_slots:
+        token = _holding_slot.set(True)
+        try:
+            yield
+        finally:
+            _holding_slot.reset(token)
+
+
+@asynccontextmanager
+async def _async_slot():
+    if _holding_slot.get():
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    slots = _async_slots.get(loop)
+    if slots is None:
+        slots = _async_slots.setdefault(loop, asyncio.Semaphore(LLM_MAX_CONCURRENCY))
+    async with slots:
+        token = _holding_slot.set(True)
+        try:
+            yield
+        finally:
+            _holding_slot.reset(token)
+
+
+class PooledChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that waits for a global slot before each request, behind the openrouter circuit.
+
+    The slot is taken first: time spent queued behind our own concurrency cap
+    (and a deadline that runs out there) says nothing about OpenRouter.
+    """
+
+    def _generate(self, *args, **kwargs):
+        with _sync_slot(), openrouter_breaker.guard():
+            return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args, **kwargs):
+        async with _async_slot():
+            with openrouter_breaker.guard():
+                return await super()._agenerate(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        with _sync_slot(), openrouter_breaker.guard():
+            yield from super()._stream(*args, **kwargs)
+
+    async def _astream(self, *args, **kwargs):
+        async with _async_slot():
+            with openrouter_breaker.guard():
+                async for chunk in super()._astream(*args, **kwargs):
+                    yield chunk
+
+
+# Usage counters
+class UsageTracker(BaseCallbackHandler):
+    """Counts calls, errors and tokens per model from LangChain callbacks."""
+
+    run_inline = True  # cheap and lock-protected, no need for an executor hop
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._usage = defaultdict(lambda: {
+            "calls": 0,
+            "errors": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        })
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        model = (kwargs.get("invocation_params") or {}).get("model") or "unknown"
+        with self._lock:
+            self._runs[run_id] = (model, time.perf_counter())
+
+    def _finish(self, run_id) -> str:
+        with self._lock:
+            model, started = self._runs.pop(run_id, ("unknown", None))
+        if started is not None:
+            LLM_SECONDS.observe(time.perf_counter() - started, model)
+        return model
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt, completion = _token_usage(response)
+        model = self._finish(run_id)
+        LLM_CALLS.inc(model, "ok")
+        LLM_TOKENS.inc(model, "prompt", amount=prompt)
+        LLM_TOKENS.inc(model, "completion", amount=completion)
+        with self._lock:
+            usage = self._usage[model]
+            usage["calls"] += 1
+            usage["prompt_tokens"] += prompt
+            usage["completion_tokens"] += completion
+            usage["total_tokens"] += prompt + completion
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        model = self._finish(run_id)
+        LLM_CALLS.inc(model, "error")
+        with self._lock:
+            usage = self._usage[model]
+            usage["calls"] += 1
+            usage["errors"] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {model: dict(usage) for model, usage in self._usage.items()}
+
+
+def _token_usage(response) -> tuple:
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        return token_usage.get("prompt_tokens") or 0, token_usage.get("completion_tokens") or 0
+
+    # streamed responses carry usage on the message instead
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt += usage.get("input_tokens", 0)
+            completion += usage.get("output_tokens", 0)
+    return prompt, completion
+
+
+usage_tracker = UsageTracker()
+
+
+def get_llm_usage() -> Dict[str, dict]:
+    return usage_tracker.snapshot()
+
+
+# Shared HTTP pools
+_lock = threading.Lock()
+_http_client = None
+_http_async_client = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _http_clients():
+    global _http_client, _http_async_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_limits(), timeout=LLM_TIMEOUT)
+            _http_async_client = httpx.AsyncClient(limits=_limits(), timeout=LLM_TIMEOUT)
+    return _http_client, _http_async_client
+
+
+# Registry
+_registry: Dict[tuple, ChatOpenAI] = {}
+_override = None
+
+
+def set_llm_override(llm=None):
+    """Serve ``llm`` from get_llm() for every model (benchmarks, local stand-ins); None restores."""
+    global _override
+    _override = llm
+
+
+def get_llm(model: str = DEFAULT_MODEL, **params) -> ChatOpenAI:
+    """Shared chat model for ``model``; built on first use, then reused by every agent."""
+    if _override is not None:
+        return _override
+    key = (model, tuple(sorted(params.items())))
+    llm = _registry.get(key)
+    if llm is not None:
+        return llm
+
+    http_client, http_async_client = _http_clients()
+    with _lock:
+        if key not in _registry:
+            _registry[key] = PooledChatOpenAI(
+                model=model,
+                openai_api_key=os.getenv("OPENROUTER_API_KEY"),
+                openai_api_base=OPENROUTER_BASE_URL,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                callbacks=[usage_tracker],
+                **params,
+            )
+        return _registry[key]
+
+
+async def aclose_llm_clients():
+    global _http_client, _http_async_client
+    with _lock:
+        http_client, http_async_client = _http_client, _http_async_client
+        _http_client = _http_async_client = None
+        _registry.clear()
+    if http_client is not None:
+        http_client.close()
+        await http_async_client.aclose()
@@ -0,0 +1,209 @@
+# shared/metrics.py
+# In-process counters and latency histograms, rendered in the Prometheus text format at /metrics.
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labelvalues, amount: float = 1):
+        key = tuple(str(v) for v in labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(tuple(str(v) for v in labelvalues), 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Value read from ``func`` at scrape time; func returns {labelvalues tuple: value}."""
+
+    def __init__(self, name: str, help: str, labelnames=(), func=None):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.func = func
+        _registry.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.func() if self.func else {}
+        except Exception as e:
+            print(f"[metrics] gauge {self.name} failed: {e}")
+            values = {}
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labelvalues):
+        key = tuple(str(v) for v in labelvalues)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series['count']}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Metrics
+NODE_SECONDS = Histogram("healthbot_node_seconds", "Graph node latency", ["node"])
+NODE_CALLS = Counter("healthbot_node_calls_total", "Graph node executions", ["node", "status"])
+NODE_SKIPPED = Counter("healthbot_node_skipped_total", "Nodes dropped for their fallback", ["node", "reason"])
+
+LLM_SECONDS = Histogram("healthbot_llm_request_seconds", "LLM request latency", ["model"])
+LLM_CALLS = Counter("healthbot_llm_requests_total", "LLM requests", ["model", "status"])
+LLM_TOKENS = Counter("healthbot_llm_tokens_total", "LLM tokens used", ["model", "type"])
+
+EXTERNAL_SECONDS = Histogram("healthbot_external_call_seconds", "Tavily/Twilio call latency", ["service"])
+EXTERNAL_CALLS = Counter("healthbot_external_calls_total", "Tavily/Twilio calls", ["service", "status"])
+CIRCUIT_REJECTED = Counter("healthbot_circuit_rejected_total", "Calls refused by an open circuit", ["service"])
+
+DB_SECONDS = Histogram("healthbot_db_seconds", "DB function latency", ["operation"])
+DB_CALLS = Counter("healthbot_db_calls_total", "DB function calls", ["operation", "status"])
+
+WRITE_BEHIND_DROPPED = Counter("healthbot_write_behind_dropped_total", "Log rows lost with the buffer full and the DB failing", ["kind"])
+
+ALERTS = Counter("healthbot_alerts_total", "Emergency alerts by outcome", ["result"])
+EMERGENCY_TRIAGE = Counter("healthbot_emergency_triage_total", "Red-flag pre-filter outcomes", ["result"])
+LOCAL_INTENT = Counter("healthbot_local_intent_total", "Local intent classifier outcomes", ["result"])
+
+PROMPT_SECTION_TOKENS = Histogram(
+    "healthbot_prompt_section_tokens", "Tokens per packed prompt section", ["section"],
+    buckets=(25, 50, 100, 200, 400, 800, 1600, 3200),
+)
+
+CACHE_REQUESTS = Counter("healthbot_cache_requests_total", "Response cache lookups", ["cache", "agent", "result"])
+
+
+# Instrumentation helpers
+# No functools.wraps on node wrappers: RunnableLambda would read the wrapped
+# signature and start passing `config` to a function that doesn't take it.
+def timed_node(name: str, func):
+    def wrapper(state):
+        t0 = time.perf_counter()
+        status = "error"
+        try:
+            result = func(state)
+            status = "ok"
+            return result
+        finally:
+            NODE_SECONDS.observe(time.perf_counter() - t0, name)
+            NODE_CALLS.inc(name, status)
+    return wrapper
+
+
+def atimed_node(name: str, afunc):
+    async def wrapper(state):
+        t0 = time.perf_counter()
+        status = "error"
+        try:
+            result = await afunc(state)
+            status = "ok"
+            return result
+        finally:
+            NODE_SECONDS.observe(time.perf_counter() - t0, name)
+            NODE_CALLS.inc(name, status)
+    return wrapper
+
+
+@contextmanager
+def track_call(service: str):
+    """Time an external call (works around sync calls and awaits alike)."""
+    t0 = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        EXTERNAL_SECONDS.observe(time.perf_counter() - t0, service)
+        EXTERNAL_CALLS.inc(service, status)
+
+
+def timed_db(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        status = "error"
+        try:
+            result = func(*args, **kwargs)
+            status = "ok"
+            return result
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - t0, func.__name__)
+            DB_CALLS.inc(func.__name__, status)
+    return wrapper
+
+
+def atimed_db(afunc):
+    @functools.wraps(afunc)
+    async def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        status = "error"
+        try:
+            result = await afunc(*args, **kwargs)
+            status = "ok"
+            return result
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - t0, afunc.__name__)
+            DB_CALLS.inc(afunc.__name__, status)
+    return wrapper
@@ -0,0 +1,302 @@
+# shared/resilience.py
+# Keeps one slow or failing dependency from holding a /chat request open.
+#
+# Deadlines: each request gets an absolute `_deadline` in its state; every graph
+# node runs under min(its own budget, time left), and nodes before the summary
+# also leave FINAL_SUMMARY_RESERVE_SECONDS for it. A node that runs out of time
+# is dropped and its fallback update is used instead, so the summary works
+# from whatever did finish.
+#
+# Circuit breakers: one per external service (openrouter, tavily, twilio).
+# After CIRCUIT_FAILURE_THRESHOLD consecutive failures, calls fail fast with
+# CircuitOpenError for CIRCUIT_RESET_SECONDS, then a single trial call decides
+# whether the circuit closes again.
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from shared.metrics import CIRCUIT_REJECTED, NODE_SKIPPED, Gauge
+
+load_dotenv()
+
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+NODE_TIMEOUT_SECONDS = float(os.getenv("NODE_TIMEOUT_SECONDS", "15"))
+NODE_TIMEOUTS = os.getenv("NODE_TIMEOUTS", "")   # per node overrides, e.g. info_search=8,final_summary=20
+FINAL_SUMMARY_RESERVE_SECONDS = float(os.getenv("FINAL_SUMMARY_RESERVE_SECONDS", "8"))
+NODE_TIMEOUT_THREADS = int(os.getenv("NODE_TIMEOUT_THREADS", "16"))   # sync graph.invoke only
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+
+def _parse_timeouts(spec: str) -> Dict[str, float]:
+    timeouts = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, seconds = part.split("=", 1)
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+_node_timeouts = _parse_timeouts(NODE_TIMEOUTS)
+
+
+# Deadlines
+def new_deadline(seconds: float = REQUEST_DEADLINE_SECONDS) -> float:
+    return time.time() + seconds
+
+
+def time_left(state) -> Optional[float]:
+    deadline = state.get("_deadline")
+    return None if deadline is None else deadline - time.time()
+
+
+def node_timeout(name: str, state, reserve: float = 0.0) -> float:
+    """Seconds ``name`` may run: its own budget, cut to the request's time left minus ``reserve``."""
+    timeout = _node_timeouts.get(name, NODE_TIMEOUT_SECONDS)
+    left = time_left(state)
+    if left is not None:
+        timeout = min(timeout, left - reserve)
+    return max(timeout, 0.0)
+
+
+def skip_node(state, name: str) -> dict:
+    return {"skipped_nodes": [name]}
+
+
+def _skip(name: str, reason: str, fallback, state):
+    NODE_SKIPPED.inc(name, reason)
+    print(f"[Resilience] {name} dropped ({reason})")
+    return fallback(state, name)
+
+
+def _own_copy(state) -> dict:
+    # agents write into agent_outputs in place; a node that is given up on
+    # must not change the dict the rest of the graph reads
+    state = dict(state)
+    state["agent_outputs"] = dict(state.get("agent_outputs") or {})
+    return state
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _node_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(NODE_TIMEOUT_THREADS, thread_name_prefix="node")
+    return _executor
+
+
+# No functools.wraps, for the same reason as shared.metrics.timed_node
+def bounded_node(name: str, func, fallback=skip_node, reserve: float = FINAL_SUMMARY_RESERVE_SECONDS):
+    def wrapper(state):
+        timeout = node_timeout(name, state, reserve)
+        if timeout <= 0:
+            return _skip(name, "deadline", fallback, state)
+        # a thread can't be cancelled: past the timeout it finishes in the background, unused
+        future = _node_executor().submit(contextvars.copy_context().run, func, _own_copy(state))
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return _skip(name, "timeout", fallback, state)
+        except CircuitOpenError:
+            return _skip(name, "circuit_open", fallback, state)
+    return wrapper
+
+
+# Set while a bounded node's task runs and fired just before its timeout
+# cancels it, so guard() can tell that cancellation (the service hung) from
+# any other (client disconnected, sibling task cancelled).
+_deadline_expired: ContextVar[Optional[threading.Event]] = ContextVar("deadline_expired", default=None)
+
+
+def abounded_node(name: str, afunc, fallback=skip_node, reserve: float = FINAL_SUMMARY_RESERVE_SECONDS):
+    async def wrapper(state):
+        timeout = node_timeout(name, state, reserve)
+        if timeout <= 0:
+            return _skip(name, "deadline", fallback, state)
+        expired = threading.Event()
+        token = _deadline_expired.set(expired)
+        try:
+            task = asyncio.ensure_future(afunc(_own_copy(state)))   # copies the context, with `expired`
+        finally:
+            _deadline_expired.reset(token)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if not done:
+            # cancels the node's in-flight LLM/Tavily request
+            expired.set()
+            task.cancel()
+            await asyncio.wait({task})
+            return _skip(name, "timeout", fallback, state)
+        try:
+            return task.result()
+        except CircuitOpenError:
+            return _skip(name, "circuit_open", fallback, state)
+    return wrapper
+
+
+# Circuit breakers
+class CircuitOpenError(RuntimeError):
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"{service} circuit open, retry in {retry_in:.0f}s")
+        self.service = service
+        self.retry_in = retry_in
+
+
+@lru_cache(maxsize=None)
+def _transport_errors() -> tuple:
+    # imported on first use; openai's client is httpx, Twilio's and Tavily's are requests/aiohttp
+    import aiohttp
+    import httpx
+    import openai
+    import requests
+    return (
+        TimeoutError, ConnectionError,   # TimeoutError is also asyncio.TimeoutError
+        httpx.TransportError, openai.APIConnectionError,   # APITimeoutError is a subclass
+        requests.ConnectionError, requests.Timeout, aiohttp.ClientConnectionError,
+    )
+
+
+def _status(error: BaseException):
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status is None:   # httpx.HTTPStatusError, requests.HTTPError
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Timeouts, connection errors, 5xx and 429 say the service is unwell.
+
+    Anything else (other 4xx, a bad response we failed to parse, our own bugs) doesn't.
+    """
+    if isinstance(error, _transport_errors()):
+        return True
+    status = _status(error)
+    return isinstance(status, int) and (status >= 500 or status == 429)
+
+
+def _is_tavily_failure(error: BaseException) -> bool:
+    from langchain_core.tools import ToolException   # Tavily's "no results"
+    return not isinstance(error, ToolException) and is_provider_failure(error)
+
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(self, service: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS, is_failure=is_provider_failure):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+        # set inside guard(), so a call nested in another (e.g. _generate -> _stream) isn't counted twice
+        self._inside: ContextVar[bool] = ContextVar(f"circuit_{service}", default=False)
+
+    def retry_in(self) -> float:
+        return max(self.opened_at + self.reset_seconds - time.monotonic(), 0.0)
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected; doesn't use up the half-open trial."""
+        with self._lock:
+            return self.state == HALF_OPEN or (self.state == OPEN and self.retry_in() > 0)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.retry_in() <= 0:
+                self.state = HALF_OPEN   # this caller is the trial
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"[Resilience] {self.service} circuit opened after {self.failures} failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def _release_trial(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN   # inconclusive: the next caller gets the trial
+
+    @contextmanager
+    def guard(self):
+        if self._inside.get():
+            yield
+            return
+        if not self.allow():
+            CIRCUIT_REJECTED.inc(self.service)
+            raise CircuitOpenError(self.service, self.retry_in())
+        token = self._inside.set(True)
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except asyncio.CancelledError:
+            # only our own node deadline means the call hung; any other
+            # cancellation says nothing about the service
+            expired = _deadline_expired.get()
+            if expired is not None and expired.is_set():
+                self.record_failure()
+            else:
+                self._release_trial()
+            raise
+        except BaseException:
+            self._release_trial()
+            raise
+        else:
+            self.record_success()
+        finally:
+            self._inside.reset(token)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "retry_in": round(self.retry_in(), 1)}
+
+
+openrouter_breaker = CircuitBreaker("openrouter")
+tavily_breaker = CircuitBreaker("tavily", is_failure=_is_tavily_failure)
+twilio_breaker = CircuitBreaker("twilio")
+breakers = {b.service: b for b in (openrouter_breaker, tavily_breaker, twilio_breaker)}
+
+Gauge(
+    "healthbot_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open", ["service"],
+    func=lambda: {(name,): _STATE_VALUES[b.state] for name, b in breakers.items()},
+)
@@ -0,0 +1,105 @@
+# shared/startup.py
+# Startup-time report: what each import and init step costs at process start.
+# main.py records its imports and lifespan steps here; the report is printed
+# once startup finishes and exported as healthbot_startup_seconds. For a fresh
+# process breakdown of the API import chain plus the lazily built clients:
+#
+#   python -m shared.startup
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+
+from shared.metrics import Gauge
+
+_steps = {}     # step -> seconds, in the order they ran
+
+Gauge(
+    "healthbot_startup_seconds", "Import and init cost at process start", ["step"],
+    func=lambda: {(step,): seconds for step, seconds in _steps.items()},
+)
+
+# In dependency order, so each one's time is what it adds on top of the ones before
+API_IMPORT_CHAIN = (
+    "dotenv",
+    "sqlalchemy",
+    "shared.metrics",
+    "db.postgres_adapter",
+    "langchain_core",
+    "langchain_openai",
+    "shared.llm_provider",
+    "langgraph.graph",
+    "agents.symptom_agent",
+    "agents.emergency_alert_agent",
+    "agents.intent_classifier_agent",
+    "agents.home_remedy_agent",
+    "agents.physical_relief_agent",
+    "agents.info_search_agent",
+    "agents.general_medical_agent",
+    "agents.memory_reader_agent",
+    "agents.final_summary_agent",
+    "agents.triage_agent",
+    "workflows.workflow",
+    "workers.alert_dispatcher",
+    "workers.memory_jobs",
+    "fastapi",
+    "api.routes",
+    "main",
+)
+
+
+@contextmanager
+def startup_step(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _steps[name] = _steps.get(name, 0.0) + time.perf_counter() - t0
+
+
+def timed_import(module: str):
+    """Import ``module``, recording what it added (its not-yet-loaded dependencies included)."""
+    if module in sys.modules:
+        return sys.modules[module]
+    with startup_step(f"import {module}"):
+        return importlib.import_module(module)
+
+
+def startup_report() -> list:
+    return list(_steps.items())
+
+
+def print_startup_report(title: str = "startup"):
+    total = sum(_steps.values())
+    print(f"\n== {title}: {total * 1000:.0f} ms")
+    for step, seconds in _steps.items():
+        share = seconds / total * 100 if total else 0.0
+        print(f"{step:<40} {seconds * 1000:>9.1f} ms  {share:>5.1f}%")
+
+
+def main():
+    for module in API_IMPORT_CHAIN:
+        timed_import(module)
+
+    from db.postgres_adapter import init_db
+    from api.routes import get_graph
+    from agents.info_search_agent import get_search_tool
+    from workers.alert_dispatcher import get_twilio_client
+    from shared.llm_provider import get_llm
+
+    with startup_step("init_db"):
+        init_db()
+    with startup_step("build graph"):
+        get_graph()
+    # built on first use in the API; shown here so their cost is visible too
+    for name, build in (("llm client", get_llm), ("tavily client", get_search_tool), ("twilio client", get_twilio_client)):
+        with startup_step(name):
+            try:
+                build()
+            except Exception as e:
+                print(f"[startup] {name} failed: {e}")
+    print_startup_report("import chain and init")
+
+
+if __name__ == "__main__":
+    main()
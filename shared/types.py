@@ -6,26 +6,52 @@ def keep_first(a, b):
     return a if a else b
 
 
+# Parallel branches may each hand back the full state, so list channels
+# append only items they have not seen yet instead of concatenating.
+def merge_unique(a, b):
+    merged = list(a or [])
+    for item in b or []:
+        if item not in merged:
+            merged.append(item)
+    return merged
+
+
+def keep_max(a, b):
+    if not isinstance(b, (int, float)):
+        return a if a is not None else b
+    if not isinstance(a, (int, float)):
+        return b
+    return max(a, b)
+
+
 
 
 class HealthBotState(TypedDict, total=False):
     messages: Annotated[List, add_messages]
     agent_outputs: Annotated[dict, operator.or_]
-    intents: Annotated[List[str], operator.add]
+    intents: Annotated[List[str], merge_unique]
     user_id: Annotated[str, keep_first]
     symptoms: Annotated[list[str], keep_first]
     stress_level: Annotated[Optional[str], keep_first]  
-    risk_score: Annotated[Optional[float], keep_first]  
+    risk_score: Annotated[Optional[float], keep_max]  
     response_message: Annotated[Optional[str],keep_first]  
     timestamp: Annotated[Optional[str], keep_first]  
     recommended_path: Annotated[Optional[str], keep_first] 
     alert_sent: Annotated[bool,keep_first] 
     location: Annotated[str, keep_first]  
-    suspected_diseases: Annotated[List[str], operator.add]
+    suspected_diseases: Annotated[List[str], merge_unique]
+    emergency_flags: Annotated[List[str], merge_unique]
    
     
     _info_mode: Annotated[str,keep_first]  
     _search_topic: Annotated[Optional[str], keep_first]  
-    _search_results: Annotated[List[Dict], operator.add]
+    _search_results: Annotated[List[Dict], merge_unique]
+    _intent_source: Annotated[Optional[str], keep_first]
+    _emergency_verdict: Annotated[Optional[str], keep_first]
+    _emergency_source: Annotated[Optional[str], keep_first]
+    _symptom_frequencies: Annotated[Dict[int, Dict[str, int]], keep_first]
     session_id: Annotated[str,keep_first] 
-    memory_context: Annotated[List[str], operator.add]  
+    _deadline: Annotated[Optional[float], keep_first]       # epoch seconds, see shared/resilience.py
+    skipped_nodes: Annotated[List[str], merge_unique]      # dropped on timeout or an open circuit
+    warnings: Annotated[List[str], merge_unique]           # appended to the final reply
+    memory_context: Annotated[List[str], merge_unique]  
@@ -0,0 +1,11 @@
+# tests/conftest.py
+# Modules read their settings at import, so the test environment is set up here, first.
+import os
+import tempfile
+
+os.environ.setdefault("POSTGRES_URL", f"sqlite:///{tempfile.mkdtemp(prefix='healthbot-test-')}/healthbot.db")
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACtest")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "test")
+os.environ.setdefault("CONTEXT_TOKENIZER", "approx")
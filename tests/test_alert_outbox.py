@@ -0,0 +1,74 @@
+# tests/test_alert_outbox.py
+# Alert dedup (one alert per user and kind per window) and outbox leases.
+import threading
+import uuid
+
+import pytest
+
+from db.postgres_adapter import (
+    AlertOutbox, SessionLocal, claim_due_alerts, enqueue_alert, init_db, mark_alerts_failed, release_alerts,
+)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def db():
+    init_db()
+
+
+@pytest.fixture
+def user():
+    return f"user-{uuid.uuid4().hex[:8]}"
+
+
+def _alerts(user_id: str) -> list:
+    session = SessionLocal()
+    try:
+        return session.query(AlertOutbox).filter(AlertOutbox.user_id == user_id).order_by(AlertOutbox.id).all()
+    finally:
+        session.close()
+
+
+def test_second_alert_in_window_is_deduplicated(user):
+    assert enqueue_alert(user, "emergency", "first")
+    assert not enqueue_alert(user, "emergency", "second")
+    assert enqueue_alert(user, "frequency", "other kind")
+    assert enqueue_alert(f"{user}-2", "emergency", "other user")
+    assert [a.body for a in _alerts(user)] == ["first", "other kind"]
+
+
+def test_window_slides_from_the_last_alert(user):
+    assert enqueue_alert(user, "emergency", "first")
+    # the holder is older than a zero-minute window, so it's retired
+    assert enqueue_alert(user, "emergency", "second", window_minutes=0)
+    assert not enqueue_alert(user, "emergency", "third")
+    assert len(_alerts(user)) == 2
+
+
+def test_failed_alert_does_not_suppress_the_next(user):
+    assert enqueue_alert(user, "emergency", "first")
+    mark_alerts_failed([_alerts(user)[0].id], "twilio down")   # given up on
+    assert enqueue_alert(user, "emergency", "second")
+    assert [a.status for a in _alerts(user)] == ["failed", "pending"]
+
+
+def test_concurrent_enqueues_queue_one_alert(user):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(enqueue_alert(user, "emergency", "x"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count(True) == 1
+    assert len(_alerts(user)) == 1
+
+
+def test_released_alerts_are_due_again_without_an_attempt(user):
+    enqueue_alert(user, "emergency", "body")
+    alert_id = _alerts(user)[0].id
+
+    claimed = [a for a in claim_due_alerts(1000, 60) if a["id"] == alert_id]
+    assert claimed and claimed[0]["attempts"] == 1
+    release_alerts([alert_id])
+
+    claimed = [a for a in claim_due_alerts(1000, 60) if a["id"] == alert_id]
+    assert claimed and claimed[0]["attempts"] == 1
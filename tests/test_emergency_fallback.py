@@ -0,0 +1,72 @@
+# tests/test_emergency_fallback.py
+# A dropped emergency check (timeout, deadline, open circuit) must never read as SAFE.
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+
+from agents.emergency_alert_agent import _pending_alert, emergency_fallback
+from agents.red_flag_triage import EMERGENCY, REVIEW, SAFE
+from shared.resilience import CircuitOpenError, abounded_node, bounded_node
+
+NO_HISTORY = {7: {}, 30: {}}
+
+
+def _state(text: str, deadline: float = 5.0) -> dict:
+    return {
+        "user_id": "u1",
+        "messages": [HumanMessage(content=text)],
+        "symptoms": [],
+        "agent_outputs": {},
+        "_deadline": time.time() + deadline,
+    }
+
+
+def _run(node, state: dict) -> dict:
+    update = asyncio.run(node(state))
+    return {**state, **update}
+
+
+async def _hangs(state):
+    await asyncio.sleep(10)
+
+
+async def _circuit_open(state):
+    raise CircuitOpenError("openrouter", 30)
+
+
+def test_timed_out_classifier_queues_review_alert():
+    node = abounded_node("emergency_classifier", _hangs, emergency_fallback, reserve=0.0)
+    state = _run(node, _state("my head feels strange and heavy since this morning", deadline=0.2))
+
+    assert state["_emergency_verdict"] == REVIEW
+    assert state["skipped_nodes"] == ["emergency_classifier"]
+    kind, body = _pending_alert(state, NO_HISTORY)
+    assert kind == "review"
+    assert body.startswith("Please review for user u1")
+
+
+def test_open_circuit_still_escalates_red_flags():
+    node = abounded_node("emergency_classifier", _circuit_open, emergency_fallback, reserve=0.0)
+    state = _run(node, _state("crushing chest pain and I can't breathe"))
+
+    assert state["_emergency_verdict"] == EMERGENCY
+    kind, _ = _pending_alert(state, NO_HISTORY)
+    assert kind == "emergency"
+
+
+def test_past_deadline_sync_triage_is_flagged():
+    node = bounded_node("triage", lambda state: {}, emergency_fallback)
+    state = _state("I feel odd", deadline=-1)
+    state = {**state, **node(state)}
+
+    assert state["_emergency_verdict"] == REVIEW
+    assert _pending_alert(state, NO_HISTORY)[0] == "review"
+
+
+def test_benign_message_stays_safe_without_alert():
+    node = abounded_node("emergency_classifier", _circuit_open, emergency_fallback, reserve=0.0)
+    state = _run(node, _state("thanks, that helped"))
+
+    assert state["_emergency_verdict"] == SAFE
+    assert _pending_alert(state, NO_HISTORY) is None
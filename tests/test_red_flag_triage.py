@@ -0,0 +1,64 @@
+# tests/test_red_flag_triage.py
+# The rules may escalate or defer to the model; they may only say SAFE when sure.
+import pytest
+
+from agents.red_flag_triage import EMERGENCY, SAFE, triage
+
+
+@pytest.mark.parametrize("text, label", [
+    ("crushing chest pain and sweating", "chest pain"),
+    ("hi, i want to hurt myself", "self harm"),
+    ("she took 20 pills an hour ago", "self harm"),
+    ("ok, he drank bleach", "poisoning"),
+    ("my son swallowed some rat poison", "poisoning"),
+    ("I can't wake him up", "loss of consciousness"),
+    ("his lips are turning blue", "breathing difficulty"),
+    ("I think I'm having a stroke", "stroke signs"),
+])
+def test_red_flags_escalate(text, label):
+    verdict, flags = triage(text)
+    assert verdict == EMERGENCY
+    assert label in flags
+
+
+@pytest.mark.parametrize("text", [
+    # a greeting or benign word in front doesn't make the rest safe
+    "hello, my husband is not responding",
+    "hey my wife cant talk properly",
+    "hi, my dad is not himself today",
+    "I'm stressed, my son is missing",
+    "exercises after my knee surgery",
+    "is the pharmacy open? my mother fell",
+    "hiccups won't stop",
+    # negated red flags are the model's call
+    "I don't have chest pain",
+    # not emergencies, but not for the rules to wave through either
+    "what are the signs of a stroke",
+    "the app is not responding",
+])
+def test_unsure_messages_go_to_the_model(text):
+    assert triage(text) == (None, [])
+
+
+@pytest.mark.parametrize("text", [
+    "hi",
+    "good morning!",
+    "ok thanks bye",
+    "thanks, that helped",
+    "I have a mild headache, any tips?",
+    "how to reduce stress",
+    "is the pharmacy open today?",
+    "any remedies for a runny nose?",
+    "trouble sleeping lately",
+])
+def test_routine_messages_are_safe(text):
+    assert triage(text) == (SAFE, [])
+
+
+@pytest.mark.parametrize("text", ["heat stroke tips", "what a stroke of luck"])
+def test_stroke_needs_context(text):
+    assert triage(text)[0] != EMERGENCY
+
+
+def test_long_messages_are_never_safe_by_rule():
+    assert triage("hi " * 16) == (None, [])
@@ -0,0 +1,104 @@
+# tests/test_resilience.py
+# Circuit breaker accounting: only the provider hanging or failing counts against it.
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+from shared import llm_provider
+from shared.resilience import CLOSED, OPEN, CircuitBreaker, abounded_node, openrouter_breaker
+
+
+@pytest.fixture
+def breaker():
+    openrouter_breaker.record_success()
+    yield openrouter_breaker
+    openrouter_breaker.record_success()
+
+
+@pytest.fixture
+def hanging_llm(monkeypatch):
+    async def hang(self, *args, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(ChatOpenAI, "_agenerate", hang)
+    return llm_provider.PooledChatOpenAI(model="test", openai_api_key="test")
+
+
+def _ask(llm):
+    async def node(state):
+        await llm.ainvoke([HumanMessage(content="hello")])
+        return {}
+    return abounded_node("test_node", node, reserve=0.0)
+
+
+def _deadline(seconds: float) -> dict:
+    return {"_deadline": time.time() + seconds}
+
+
+def test_deadline_on_an_in_flight_call_counts(breaker, hanging_llm):
+    update = asyncio.run(_ask(hanging_llm)(_deadline(0.1)))
+
+    assert update == {"skipped_nodes": ["test_node"]}
+    assert breaker.failures == 1
+
+
+def test_deadline_while_queued_for_a_slot_does_not_count(breaker, hanging_llm, monkeypatch):
+    async def run():
+        # every slot taken by our own traffic: the call never reaches OpenRouter
+        monkeypatch.setitem(llm_provider._async_slots, asyncio.get_running_loop(), asyncio.Semaphore(0))
+        return await _ask(hanging_llm)(_deadline(0.1))
+
+    assert asyncio.run(run()) == {"skipped_nodes": ["test_node"]}
+    assert breaker.failures == 0
+    assert breaker.state == CLOSED
+
+
+def test_other_cancellations_do_not_count(breaker, hanging_llm):
+    async def run():
+        task = asyncio.ensure_future(_ask(hanging_llm)(_deadline(5)))
+        await asyncio.sleep(0.1)
+        task.cancel()   # e.g. the client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.failures == 0
+
+
+def test_cancelled_half_open_trial_is_released():
+    b = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.01)
+    b.record_failure()
+    time.sleep(0.02)
+
+    async def trial():
+        with b.guard():
+            await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.ensure_future(trial())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert b.state == OPEN
+    assert b.failures == 1
+    assert b.allow()   # the next caller gets the trial
+
+
+def test_caller_errors_do_not_trip_the_circuit():
+    b = CircuitBreaker("test", failure_threshold=1)
+    for error in (KeyError("x"), ValueError("bad json"), TypeError()):
+        with pytest.raises(type(error)):
+            with b.guard():
+                raise error
+    assert b.state == CLOSED
+
+    with pytest.raises(TimeoutError):
+        with b.guard():
+            raise TimeoutError()
+    assert b.state == OPEN
@@ -0,0 +1,56 @@
+# voice/mic.py
+# Microphone capture: one open input stream whose blocks go through the
+# UtteranceDetector, yielding each utterance as soon as the speaker stops.
+import os
+import queue
+import threading
+
+from dotenv import load_dotenv
+
+from voice.vad import SAMPLE_RATE, VAD_FRAME_MS, UtteranceDetector
+
+load_dotenv()
+
+# blocks the capture callback may queue while the consumer is busy (~30 ms each)
+MIC_QUEUE_BLOCKS = int(os.getenv("MIC_QUEUE_BLOCKS", "2000"))
+
+
+def listen(stop: threading.Event, detector: UtteranceDetector = None, sample_rate: int = SAMPLE_RATE):
+    """Yield utterances (float32 NumPy arrays) from the default microphone until ``stop`` is set."""
+    import sounddevice as sd
+
+    detector = detector or UtteranceDetector(sample_rate=sample_rate)
+    blocks = queue.Queue(maxsize=MIC_QUEUE_BLOCKS)
+
+    def on_audio(indata, frames, time_info, status):
+        try:
+            blocks.put_nowait(indata[:, 0].copy())
+        except queue.Full:
+            pass  # consumer is far behind; losing audio beats unbounded memory
+
+    with sd.InputStream(samplerate=sample_rate, channels=1, dtype="float32",
+                        blocksize=sample_rate * VAD_FRAME_MS // 1000, callback=on_audio):
+        while not stop.is_set():
+            try:
+                block = blocks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            for utterance in detector.push(block):
+                yield utterance
+
+    last = detector.flush()
+    if last is not None:
+        yield last
+
+
+def record_once(timeout: float = 10.0, sample_rate: int = SAMPLE_RATE):
+    """The first utterance within ``timeout`` seconds, or None."""
+    stop = threading.Event()
+    timer = threading.Timer(timeout, stop.set)
+    timer.start()
+    utterances = listen(stop, sample_rate=sample_rate)
+    try:
+        return next(utterances, None)
+    finally:
+        timer.cancel()
+        utterances.close()   # closes the input stream
@@ -0,0 +1,123 @@
+# voice/pipeline.py
+# Continuous voice mode as four stages on their own threads:
+#
+#   capture -> transcribe -> chat -> speak
+#
+# joined by bounded queues, so the mic keeps listening while earlier turns are
+# transcribed, answered and spoken. Nothing here touches Streamlit: results go
+# out through a thread-safe event channel that the UI drains on its own thread.
+import os
+import queue
+import threading
+from dotenv import load_dotenv
+
+from voice.mic import listen
+from voice.stt import transcribe
+
+load_dotenv()
+
+VOICE_QUEUE_SIZE = int(os.getenv("VOICE_QUEUE_SIZE", "4"))   # items waiting between two stages
+
+_POLL = 0.1
+
+
+class VoicePipeline:
+    """``chat(text) -> reply`` and ``speak(reply) -> audio path`` run on pipeline threads.
+
+    Events come out of ``drain_events()`` as (kind, payload) tuples: ("You", text),
+    ("HealthBot", reply), ("audio", path) and ("System", message).
+    """
+
+    def __init__(self, chat, speak=None, capture=listen, stt=transcribe, queue_size: int = VOICE_QUEUE_SIZE):
+        self.chat = chat
+        self.speak = speak
+        self.capture = capture
+        self.stt = stt
+        self._stop = threading.Event()
+        self._utterances = queue.Queue(maxsize=queue_size)
+        self._texts = queue.Queue(maxsize=queue_size)
+        self._replies = queue.Queue(maxsize=queue_size)
+        self._events = queue.Queue()    # unbounded: the UI drains it every rerun
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        stages = [
+            ("capture", self._capture),
+            ("transcribe", lambda: self._stage(self._utterances, self._texts, self._transcribe)),
+            ("chat", lambda: self._stage(self._texts, self._replies, self._chat)),
+            ("speak", lambda: self._stage(self._replies, None, self._speak)),
+        ]
+        self._threads = [threading.Thread(target=run, name=f"voice-{name}", daemon=True) for name, run in stages]
+        for thread in self._threads:
+            thread.start()
+        self.emit("System", "🎤 Listening...")
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def emit(self, kind: str, payload):
+        self._events.put((kind, payload))
+
+    def drain_events(self) -> list:
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    # Stages
+    def _capture(self):
+        try:
+            for utterance in self.capture(self._stop):
+                self._put(self._utterances, utterance)
+        except Exception as e:
+            self.emit("System", f" Voice Error: {e}")
+
+    def _transcribe(self, audio):
+        text = self.stt(audio)
+        if text:
+            self.emit("You", text)
+        return text or None
+
+    def _chat(self, text):
+        reply = self.chat(text)
+        self.emit("HealthBot", reply)
+        return reply if self.speak else None
+
+    def _speak(self, reply):
+        path = self.speak(reply)
+        if path:
+            self.emit("audio", path)
+
+    def _stage(self, inbox: queue.Queue, outbox, func):
+        while not self._stop.is_set():
+            try:
+                item = inbox.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+            try:
+                result = func(item)
+            except Exception as e:
+                self.emit("System", f" Voice Error: {e}")
+                continue
+            if outbox is not None and result is not None:
+                self._put(outbox, result)
+
+    def _put(self, q: queue.Queue, item):
+        # backpressure: a full queue holds the upstream stage instead of growing
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return
+            except queue.Full:
+                continue
@@ -0,0 +1,45 @@
+# voice/stt.py
+# Whisper speech-to-text on in-memory audio. The model is loaded once per
+# process, on first use, and shared by every caller.
+import os
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")   # tiny, base, small, medium, ... or *.en
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE") or None           # None: cuda when available
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "en") or None  # skips language detection
+
+_model = None
+_model_lock = threading.Lock()
+_transcribe_lock = threading.Lock()
+
+
+def get_whisper_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            import whisper
+            print(f"[Voice] loading Whisper '{WHISPER_MODEL_SIZE}'")
+            _model = whisper.load_model(WHISPER_MODEL_SIZE, device=WHISPER_DEVICE)
+    return _model
+
+
+def transcribe(audio: np.ndarray) -> str:
+    """Text for 16 kHz mono audio; the buffer goes straight to the model, no file in between."""
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    if not audio.size:
+        return ""
+    model = get_whisper_model()
+    # one decode at a time: the model isn't safe to share across concurrent calls
+    with _transcribe_lock:
+        result = model.transcribe(
+            audio,
+            language=WHISPER_LANGUAGE,
+            fp16=model.device.type == "cuda",
+            condition_on_previous_text=False,
+        )
+    return result["text"].strip()
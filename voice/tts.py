@@ -0,0 +1,170 @@
+# voice/tts.py
+# Text-to-speech behind a small engine interface, with a content-addressed
+# disk cache in front: audio is stored under a hash of (engine, language,
+# text), so a repeated reply is a file read, and the directory is kept under
+# TTS_CACHE_MAX_MB by evicting the least recently played files.
+import hashlib
+import os
+import tempfile
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TTS_ENGINE = os.getenv("TTS_ENGINE", "gtts")     # gtts (online) or pyttsx3 (offline)
+TTS_LANGUAGE = os.getenv("TTS_LANGUAGE", "en")
+TTS_CACHE_DIR = os.path.expanduser(os.getenv("TTS_CACHE_DIR", "~/.cache/healthbot/tts"))
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "200"))
+
+MIME_TYPES = {".mp3": "audio/mp3", ".wav": "audio/wav"}
+
+
+# Engines: name, extension, synthesize(text, lang, path)
+class GTTSEngine:
+    name = "gtts"
+    extension = ".mp3"
+
+    def synthesize(self, text: str, lang: str, path: str):
+        from gtts import gTTS
+        gTTS(text=text, lang=lang).save(path)
+
+
+class Pyttsx3Engine:
+    """Offline, through the OS speech engine (SAPI5, NSSpeechSynthesizer, eSpeak)."""
+
+    name = "pyttsx3"
+    extension = ".wav"
+
+    def __init__(self):
+        self._engine = None
+        self._lock = threading.Lock()   # the driver runs one utterance at a time
+
+    def synthesize(self, text: str, lang: str, path: str):
+        with self._lock:
+            if self._engine is None:
+                import pyttsx3
+                self._engine = pyttsx3.init()
+            # pyttsx3 voices are per system, not per language code; lang only keys the cache
+            self._engine.save_to_file(text, path)
+            self._engine.runAndWait()
+
+
+ENGINES = {"gtts": GTTSEngine, "pyttsx3": Pyttsx3Engine}
+
+
+def make_engine(name: str = TTS_ENGINE):
+    if name not in ENGINES:
+        raise ValueError(f"TTS_ENGINE must be one of {sorted(ENGINES)}, got {name!r}")
+    return ENGINES[name]()
+
+
+class TTSCache:
+    def __init__(self, engine, directory: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024)):
+        self.engine = engine
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        os.makedirs(directory, exist_ok=True)
+        self._sizes = {
+            entry.path: entry.stat().st_size
+            for entry in os.scandir(directory)
+            if entry.is_file() and not entry.name.startswith(".")
+        }
+
+    def path_for(self, text: str, lang: str) -> str:
+        digest = hashlib.sha256(f"{self.engine.name}\0{lang}\0{text}".encode()).hexdigest()
+        return os.path.join(self.directory, digest + self.engine.extension)
+
+    def speak(self, text: str, lang: str = TTS_LANGUAGE) -> str:
+        """Path of the audio for ``text``, synthesizing it only if it isn't cached."""
+        path = self.path_for(text, lang)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(path, threading.Lock())
+        try:
+            # one synthesis per phrase: concurrent callers for it wait, then hit
+            with key_lock:
+                hit = self._touch(path)
+                if not hit:
+                    self._synthesize(text, lang, path)
+        finally:
+            with self._lock:
+                self._key_locks.pop(path, None)
+        if not hit:
+            self._evict(keep=path)
+        return path
+
+    def _synthesize(self, text: str, lang: str, path: str):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=self.engine.extension)
+        os.close(fd)
+        try:
+            self.engine.synthesize(text, lang, tmp)
+            os.replace(tmp, path)   # readers never see a half-written file
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        with self._lock:
+            self.misses += 1
+            self._sizes[path] = os.path.getsize(path)
+
+    def _touch(self, path: str) -> bool:
+        try:
+            os.utime(path)   # mtime is the LRU clock
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self.hits += 1
+            self._sizes.setdefault(path, os.path.getsize(path))
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._sizes),
+                "bytes": sum(self._sizes.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self, keep: str):
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            by_age = sorted(self._sizes, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+            for path in by_age:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= self._sizes.pop(path)
+                self.evictions += 1
+
+
+def mime_type(path: str) -> str:
+    return MIME_TYPES.get(os.path.splitext(path)[1], "audio/mp3")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache(make_engine())
+    return _cache
+
+
+def speak(text: str, lang: str = TTS_LANGUAGE) -> str:
+    return get_tts_cache().speak(text, lang)
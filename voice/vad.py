@@ -0,0 +1,108 @@
+# voice/vad.py
+# Energy-based end-of-speech detection. Microphone blocks go in, whole
+# utterances (float32 mono NumPy arrays) come out as soon as the speaker has
+# been quiet for VAD_SILENCE_MS, instead of after a fixed recording window.
+import os
+from collections import deque
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SAMPLE_RATE = 16000                 # what Whisper expects
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "700"))          # quiet this long ends an utterance
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "250"))    # shorter bursts are noise
+VAD_MAX_UTTERANCE_S = float(os.getenv("VAD_MAX_UTTERANCE_S", "20"))
+VAD_PRE_ROLL_MS = int(os.getenv("VAD_PRE_ROLL_MS", "300"))        # kept from before speech starts
+VAD_THRESHOLD_RATIO = float(os.getenv("VAD_THRESHOLD_RATIO", "3.0"))   # speech = this many times the noise floor
+VAD_MIN_RMS = float(os.getenv("VAD_MIN_RMS", "0.01"))
+
+
+def frame_rms(frame: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(np.square(frame, dtype=np.float64)))) if frame.size else 0.0
+
+
+class UtteranceDetector:
+    """Feed audio with ``push(block)``; it returns the utterances that block completed.
+
+    A frame is speech when its RMS is above ``threshold_ratio`` times the running
+    noise floor (and above ``min_rms``). The floor follows the quiet frames, so it
+    adapts to the room.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS,
+                 silence_ms: int = VAD_SILENCE_MS, min_speech_ms: int = VAD_MIN_SPEECH_MS,
+                 max_utterance_s: float = VAD_MAX_UTTERANCE_S, pre_roll_ms: int = VAD_PRE_ROLL_MS,
+                 threshold_ratio: float = VAD_THRESHOLD_RATIO, min_rms: float = VAD_MIN_RMS):
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, sample_rate * frame_ms // 1000)
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = max(1, int(max_utterance_s * 1000 // frame_ms))
+        self.threshold_ratio = threshold_ratio
+        self.min_rms = min_rms
+        self.noise_floor = min_rms / threshold_ratio
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._pre_roll = deque(maxlen=max(0, pre_roll_ms // frame_ms))
+        self._frames = []
+        self._speech_frames = 0
+        self._silent_run = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return bool(self._frames)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = frame_rms(frame)
+        speech = rms >= max(self.min_rms, self.noise_floor * self.threshold_ratio)
+        if not speech:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+    def push(self, block: np.ndarray) -> list:
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        data = np.concatenate([self._pending, block]) if self._pending.size else block
+        usable = len(data) - len(data) % self.frame_len
+        self._pending = data[usable:].copy()
+
+        done = []
+        for start in range(0, usable, self.frame_len):
+            utterance = self._push_frame(data[start:start + self.frame_len])
+            if utterance is not None:
+                done.append(utterance)
+        return done
+
+    def flush(self):
+        """The utterance in progress, if it has enough speech (e.g. when the mic stops)."""
+        return self._finish() if self._frames else None
+
+    def _push_frame(self, frame: np.ndarray):
+        speech = self.is_speech(frame)
+        if not self._frames:
+            if speech:
+                self._frames = list(self._pre_roll) + [frame]
+                self._pre_roll.clear()
+                self._speech_frames, self._silent_run = 1, 0
+            else:
+                self._pre_roll.append(frame)
+            return None
+
+        self._frames.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+        if self._silent_run >= self.silence_frames or len(self._frames) >= self.max_frames:
+            return self._finish()
+        return None
+
+    def _finish(self):
+        frames, speech_frames, silent_run = self._frames, self._speech_frames, self._silent_run
+        self._frames, self._speech_frames, self._silent_run = [], 0, 0
+        if speech_frames < self.min_speech_frames:
+            return None
+        # drop the trailing silence that ended it, Whisper doesn't need it
+        return np.concatenate(frames[:len(frames) - silent_run] if silent_run < len(frames) else frames)
@@ -0,0 +1,185 @@
+# workers/alert_dispatcher.py
+# Sends queued WhatsApp alerts from the alert_outbox table. Runs inside the API
+# process (started from main.py's lifespan) or on its own:
+#
+#   python -m workers.alert_dispatcher
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List
+
+from dotenv import load_dotenv
+
+from db.postgres_adapter import (
+    init_db, claim_due_alerts, mark_alerts_sent, mark_alerts_failed, release_alerts, count_alerts_by_status,
+)
+from shared.metrics import ALERTS, Gauge, track_call
+from shared.resilience import CircuitOpenError, twilio_breaker
+
+load_dotenv()
+
+# Built on the first send, not at import (benchmarks swap in a fake by setting twilio_client)
+twilio_client = None
+_twilio_lock = threading.Lock()
+twilio_from = os.getenv("TWILIO_WHATSAPP_FROM")
+emergency_to = os.getenv("EMERGENCY_CONTACT")
+
+ALERT_POLL_INTERVAL = float(os.getenv("ALERT_POLL_INTERVAL", "2"))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "20"))
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", "8"))
+ALERT_BACKOFF_BASE = float(os.getenv("ALERT_BACKOFF_BASE", "5"))
+ALERT_BACKOFF_MAX = float(os.getenv("ALERT_BACKOFF_MAX", "600"))
+ALERT_LEASE_SECONDS = float(os.getenv("ALERT_LEASE_SECONDS", "60"))
+TWILIO_TIMEOUT = float(os.getenv("TWILIO_TIMEOUT", "15"))   # the client's default is to wait forever
+WHATSAPP_MAX_CHARS = 1600
+BATCH_SEPARATOR = "\n\n---\n\n"
+
+Gauge(
+    "healthbot_alert_outbox", "Alerts in the outbox by status", ["status"],
+    func=lambda: {(status,): count for status, count in count_alerts_by_status().items()},
+)
+
+
+def get_twilio_client():
+    global twilio_client
+    with _twilio_lock:
+        if twilio_client is None:
+            from twilio.http.http_client import TwilioHttpClient
+            from twilio.rest import Client
+            twilio_client = Client(
+                os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"),
+                http_client=TwilioHttpClient(timeout=TWILIO_TIMEOUT),
+            )
+    return twilio_client
+
+
+def backoff_delay(attempts: int) -> float:
+    return min(ALERT_BACKOFF_MAX, ALERT_BACKOFF_BASE * 2 ** max(attempts - 1, 0))
+
+
+def batch_alerts(alerts: List[dict], max_chars: int = WHATSAPP_MAX_CHARS) -> List[List[dict]]:
+    # Every alert goes to the same emergency contact, so pack as many as fit in one message
+    batches, current, size = [], [], 0
+    for alert in alerts:
+        length = min(len(alert["body"]), max_chars)
+        added = length + (len(BATCH_SEPARATOR) if current else 0)
+        if current and size + added > max_chars:
+            batches.append(current)
+            current, size, added = [], 0, length
+        current.append(alert)
+        size += added
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _batch_body(batch: List[dict]) -> str:
+    return BATCH_SEPARATOR.join(a["body"] for a in batch)[:WHATSAPP_MAX_CHARS]
+
+
+# False when the circuit is open and the batch wasn't tried
+def _send(batch: List[dict]) -> bool:
+    ids = [a["id"] for a in batch]
+    try:
+        with twilio_breaker.guard(), track_call("twilio"):
+            get_twilio_client().messages.create(from_=twilio_from, to=emergency_to, body=_batch_body(batch))
+    except CircuitOpenError:
+        return False
+    except Exception as e:
+        now = datetime.utcnow()
+        given_up = [a["id"] for a in batch if a["attempts"] >= ALERT_MAX_ATTEMPTS]
+        retry = [a for a in batch if a["attempts"] < ALERT_MAX_ATTEMPTS]
+        mark_alerts_failed(given_up, str(e))
+        for alert in retry:
+            mark_alerts_failed([alert["id"]], str(e), retry_at=now + timedelta(seconds=backoff_delay(alert["attempts"])))
+        if given_up:
+            ALERTS.inc("failed", amount=len(given_up))
+        if retry:
+            ALERTS.inc("retry", amount=len(retry))
+        print(f"[Alert Dispatcher] send failed for {ids}: {e}")
+        return True
+    mark_alerts_sent(ids)
+    ALERTS.inc("sent", amount=len(ids))
+    print(f"[Alert Dispatcher] sent alerts {ids}")
+    return True
+
+
+def dispatch_once() -> int:
+    """Send every due alert once; returns how many were claimed."""
+    if twilio_breaker.is_open:
+        return 0   # leave them due (attempts untouched) until the circuit lets a trial through
+    alerts = claim_due_alerts(ALERT_BATCH_SIZE, ALERT_LEASE_SECONDS)
+    batches = batch_alerts(alerts)
+    for i, batch in enumerate(batches):
+        if not _send(batch):
+            # the circuit opened mid-run (e.g. the half-open trial failed):
+            # hand the rest back as they were instead of failing them
+            unsent = [a["id"] for b in batches[i:] for a in b]
+            release_alerts(unsent)
+            print(f"[Alert Dispatcher] twilio circuit open, released alerts {unsent}")
+            break
+    return len(alerts)
+
+
+# Background loop
+_task = None
+_loop = None
+_wakeup = None
+_stopping = False
+
+
+async def _run():
+    while not _stopping:
+        try:
+            claimed = await asyncio.to_thread(dispatch_once)
+        except Exception as e:
+            print(f"[Alert Dispatcher Error] {e}")
+            claimed = 0
+        if claimed >= ALERT_BATCH_SIZE:
+            continue  # more are probably due
+        try:
+            await asyncio.wait_for(_wakeup.wait(), ALERT_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_dispatcher():
+    global _task, _loop, _wakeup, _stopping
+    if _task and not _task.done():
+        return _task
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    _stopping = False
+    _task = _loop.create_task(_run(), name="alert-dispatcher")
+    return _task
+
+
+async def stop_dispatcher(timeout: float = 10.0):
+    global _task, _stopping
+    if not _task:
+        return
+    _stopping = True
+    notify()
+    try:
+        await asyncio.wait_for(_task, timeout)
+    except asyncio.TimeoutError:
+        _task.cancel()
+    _task = None
+
+
+def notify():
+    """Wake the dispatcher now instead of at its next poll. Safe from any thread."""
+    if _loop is not None and _wakeup is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+async def _main():
+    await asyncio.to_thread(init_db)
+    start_dispatcher()
+    await _task
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,179 @@
+# workers/memory_jobs.py
+# Post-response stage: summarizing the answer and storing it to conversation_logs
+# happens here, after /chat has returned. A bounded queue feeds a small pool of
+# asyncio workers; a full queue makes submit() wait (backpressure) and, past
+# MEMORY_ENQUEUE_TIMEOUT, store the unsummarized answer instead of dropping it.
+import asyncio
+import concurrent.futures
+import os
+import time
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+from agents.memory_writer_agent import build_memory_entry, asummarize_response
+from db.postgres_adapter import astore_conversation
+from shared.metrics import Counter, Gauge, Histogram
+
+load_dotenv()
+
+MEMORY_WORKERS = int(os.getenv("MEMORY_WORKERS", "4"))
+MEMORY_QUEUE_MAXSIZE = int(os.getenv("MEMORY_QUEUE_MAXSIZE", "1000"))
+MEMORY_ENQUEUE_TIMEOUT = float(os.getenv("MEMORY_ENQUEUE_TIMEOUT", "2"))
+MEMORY_MAX_ATTEMPTS = int(os.getenv("MEMORY_MAX_ATTEMPTS", "3"))
+MEMORY_RETRY_BACKOFF = float(os.getenv("MEMORY_RETRY_BACKOFF", "1"))
+# how long the next request's memory_reader waits for the same user's pending jobs
+MEMORY_READ_WAIT = float(os.getenv("MEMORY_READ_WAIT", "5"))
+
+MEMORY_JOBS = Counter("healthbot_memory_jobs_total", "Memory writer jobs by outcome", ["result"])
+MEMORY_JOB_LAG = Histogram("healthbot_memory_job_lag_seconds", "Time from submit to stored memory")
+MEMORY_JOB_WAIT = Histogram("healthbot_memory_job_wait_seconds", "Time a memory job waited in the queue")
+Gauge("healthbot_memory_queue_depth", "Memory jobs waiting in the queue", func=lambda: {(): _queue.qsize() if _queue else 0})
+Gauge("healthbot_memory_jobs_in_flight", "Submitted memory jobs not yet stored", func=lambda: {(): sum(_pending.values())})
+
+_queue = None
+_workers = []
+_pending = defaultdict(int)     # user_id -> submitted but not yet stored
+_idle = None                    # asyncio.Condition, notified whenever a job finishes
+_loop = None                    # the loop the workers run on
+
+
+async def _summarize_with_retries(ai_response: str) -> str:
+    for attempt in range(1, MEMORY_MAX_ATTEMPTS + 1):
+        try:
+            return await asummarize_response(ai_response)
+        except Exception as e:
+            if attempt == MEMORY_MAX_ATTEMPTS:
+                print(f"[Summarization Error] Using full response. Error: {e}")
+                MEMORY_JOBS.inc("summary_failed")
+                return ai_response
+            MEMORY_JOBS.inc("retry")
+            await asyncio.sleep(MEMORY_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+
+async def _store_with_retries(entry: dict):
+    for attempt in range(1, MEMORY_MAX_ATTEMPTS + 1):
+        try:
+            await astore_conversation(entry)
+            return True
+        except Exception as e:
+            if attempt == MEMORY_MAX_ATTEMPTS:
+                print(f"[Memory Write Error] {e}")
+                return False
+            MEMORY_JOBS.inc("retry")
+            await asyncio.sleep(MEMORY_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+
+async def run_memory_job(state: dict, summarize: bool = True) -> bool:
+    ai_response = state.get("agent_outputs", {}).get("final_summary", "")
+    compressed = await _summarize_with_retries(ai_response) if summarize else ai_response
+    entry = build_memory_entry(state, compressed)
+    if entry is None:
+        return True
+    stored = await _store_with_retries(entry)
+    if stored:
+        print(f"&&& Compressed memory stored for {entry['user_id']}")
+    return stored
+
+
+async def _finish(user_id: str, submitted_at: float, result: str):
+    MEMORY_JOBS.inc(result)
+    MEMORY_JOB_LAG.observe(time.monotonic() - submitted_at)
+    async with _idle:
+        _pending[user_id] -= 1
+        if _pending[user_id] <= 0:
+            del _pending[user_id]
+        _idle.notify_all()
+
+
+async def _worker():
+    while True:
+        state, submitted_at = await _queue.get()
+        MEMORY_JOB_WAIT.observe(time.monotonic() - submitted_at)
+        result = "error"
+        try:
+            result = "ok" if await run_memory_job(state) else "failed"
+        except Exception as e:
+            print(f"[Memory Job Error] {e}")
+        finally:
+            await _finish(state.get("user_id", "unknown_user"), submitted_at, result)
+            _queue.task_done()
+
+
+def start_memory_workers(workers: int = MEMORY_WORKERS):
+    global _queue, _idle, _loop
+    if _workers:
+        return
+    _loop = asyncio.get_running_loop()
+    _queue = asyncio.Queue(maxsize=MEMORY_QUEUE_MAXSIZE)
+    _idle = asyncio.Condition()
+    for i in range(max(workers, 1)):
+        _workers.append(asyncio.create_task(_worker(), name=f"memory-worker-{i}"))
+
+
+async def stop_memory_workers(timeout: float = 30.0):
+    """Let queued jobs finish (up to ``timeout``), then stop the pool."""
+    if not _workers:
+        return
+    try:
+        await asyncio.wait_for(_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        print(f"[Memory Jobs] {_queue.qsize()} jobs still queued at shutdown")
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def submit_memory_job(state: dict):
+    """Queue the finished graph state for summarization and storage."""
+    start_memory_workers()
+    user_id = state.get("user_id", "unknown_user")
+    submitted_at = time.monotonic()
+    async with _idle:
+        _pending[user_id] += 1
+    try:
+        await asyncio.wait_for(_queue.put((state, submitted_at)), MEMORY_ENQUEUE_TIMEOUT)
+        MEMORY_JOBS.inc("queued")
+    except asyncio.TimeoutError:
+        # queue still full: keep the turn, just without the LLM summary
+        result = "degraded"
+        try:
+            await run_memory_job(state, summarize=False)
+        except Exception as e:
+            print(f"[Memory Job Error] {e}")
+            result = "error"
+        await _finish(user_id, submitted_at, result)
+
+
+async def wait_for_user(user_id: str, timeout: float = MEMORY_READ_WAIT) -> bool:
+    """Wait until this user's submitted memory jobs are stored; False on timeout."""
+    if _idle is None or not _pending.get(user_id):
+        return True
+    try:
+        async with _idle:
+            await asyncio.wait_for(_idle.wait_for(lambda: not _pending.get(user_id)), timeout)
+        return True
+    except asyncio.TimeoutError:
+        print(f"&&&& [Memory Reader] gave up waiting for {user_id}'s pending memory")
+        return False
+
+
+def wait_for_user_sync(user_id: str, timeout: float = MEMORY_READ_WAIT) -> bool:
+    """wait_for_user for the sync graph, which runs nodes in worker threads."""
+    if _idle is None or not _pending.get(user_id) or _loop is None or _loop.is_closed():
+        return True
+    try:
+        on_loop = asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        on_loop = False
+    if on_loop:
+        # blocking here would stop the very workers we're waiting for
+        print(f"&&&& [Memory Reader] can't wait for {user_id}'s pending memory on the event loop")
+        return False
+    future = asyncio.run_coroutine_threadsafe(wait_for_user(user_id, timeout), _loop)
+    try:
+        return future.result(timeout + 1)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        return False
@@ -1,18 +1,30 @@
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from shared.types import HealthBotState
+from shared.metrics import timed_node, atimed_node
+from shared.resilience import bounded_node, abounded_node, skip_node, FINAL_SUMMARY_RESERVE_SECONDS
 from typing import List
-
-from agents.symptom_agent import symptom_extractor_agent
-from db.postgres_adapter import db_handler_node
-from agents.home_remedy_agent import home_remedy_agent
-from agents.physical_relief_agent import physical_relief_agent
-from agents.info_search_agent import info_search_agent
-from agents.intent_classifier_agent import intent_classifier_agent
-from agents.general_medical_agent import general_medical_agent
-from agents.final_summary_agent import final_summary_agent
-from agents.memory_reader_agent import memory_reader_agent
-from agents.memory_writer_agent import memory_writer_agent
-from agents.emergency_alert_agent import emergency_alert_agent
+import os
+
+from agents.symptom_agent import symptom_extractor_agent, asymptom_extractor_agent
+from db.postgres_adapter import db_handler_node, adb_handler_node
+from agents.home_remedy_agent import home_remedy_agent, ahome_remedy_agent
+from agents.physical_relief_agent import physical_relief_agent, aphysical_relief_agent
+from agents.info_search_agent import build_info_search_agent
+from agents.intent_classifier_agent import intent_classifier_agent, aintent_classifier_agent
+from agents.general_medical_agent import general_medical_agent, ageneral_medical_agent
+from agents.final_summary_agent import final_summary_agent, afinal_summary_agent, fallback_summary
+from agents.memory_reader_agent import memory_reader_agent, amemory_reader_agent
+from agents.emergency_alert_agent import (
+    emergency_alert_agent, aemergency_alert_agent,
+    emergency_classifier_agent, aemergency_classifier_agent, emergency_fallback,
+)
+from agents.triage_agent import triage_agent, atriage_agent
+
+# "separate": symptom extraction, emergency check and intent classification as three
+# parallel LLM calls; "combined": one structured call in a single triage node
+TRIAGE_MODE = os.getenv("TRIAGE_MODE", "separate")
+TRIAGE_MODES = ("separate", "combined")
 
 
 # Init state 
@@ -21,6 +33,20 @@ def init_outputs(state: HealthBotState) -> HealthBotState:
     return state
 
 
+async def ainit_outputs(state: HealthBotState) -> HealthBotState:
+    return init_outputs(state)
+
+
+# Node with a sync body for graph.invoke and an async body for graph.ainvoke, timed per call.
+# Bounded nodes run under their timeout and the request deadline; past either, or with
+# their provider's circuit open, they're dropped and `fallback` supplies the update.
+def _node(name, func, afunc, bounded=True, fallback=skip_node, reserve=FINAL_SUMMARY_RESERVE_SECONDS):
+    if bounded:
+        func = bounded_node(name, func, fallback, reserve)
+        afunc = abounded_node(name, afunc, fallback, reserve)
+    return RunnableLambda(timed_node(name, func), afunc=atimed_node(name, afunc), name=name)
+
+
 # Intent routing logic
 def route_from_intent(state: HealthBotState) -> List[str]:
 
@@ -48,35 +74,56 @@ def route_from_intent(state: HealthBotState) -> List[str]:
 
 
 # workflow graph
-def build_healthbot_workflow():
+# Ends at final_summary: summarizing and storing the turn runs after the
+# response, in workers/memory_jobs.py
+def build_healthbot_workflow(triage_mode: str = TRIAGE_MODE):
+    if triage_mode not in TRIAGE_MODES:
+        raise ValueError(f"triage_mode must be one of {TRIAGE_MODES}, got {triage_mode!r}")
     graph = StateGraph(HealthBotState)
 
     # All nodes
-    graph.add_node("init_outputs", init_outputs)
-    graph.add_node("extract_symptoms", symptom_extractor_agent)
-    graph.add_node("emergency_alert", emergency_alert_agent)
-    graph.add_node("handle_db", db_handler_node)
-    graph.add_node("intent_classifier", intent_classifier_agent)
-
-    graph.add_node("home_remedy", home_remedy_agent)
-    graph.add_node("physical_relief", physical_relief_agent)
-    graph.add_node("info_search", info_search_agent)
-    graph.add_node("general_medical", general_medical_agent)
-
-    graph.add_node("memory_reader", memory_reader_agent)
-    graph.add_node("final_summary", final_summary_agent)
-    graph.add_node("memory_writer", memory_writer_agent)
+    graph.add_node("init_outputs", _node("init_outputs", init_outputs, ainit_outputs, bounded=False))
+    if triage_mode == "combined":
+        graph.add_node("triage", _node("triage", triage_agent, atriage_agent, fallback=emergency_fallback))
+    else:
+        graph.add_node("extract_symptoms", _node("extract_symptoms", symptom_extractor_agent, asymptom_extractor_agent))
+        # a dropped safety check must not read as SAFE: emergency_fallback flags it for review
+        graph.add_node("emergency_classifier", _node(
+            "emergency_classifier", emergency_classifier_agent, aemergency_classifier_agent, fallback=emergency_fallback,
+        ))
+        graph.add_node("intent_classifier", _node("intent_classifier", intent_classifier_agent, aintent_classifier_agent))
+    # never dropped: they queue the alert and log the turn, and only touch the DB
+    graph.add_node("emergency_alert", _node("emergency_alert", emergency_alert_agent, aemergency_alert_agent, bounded=False))
+    graph.add_node("handle_db", _node("handle_db", db_handler_node, adb_handler_node, bounded=False))
+
+    graph.add_node("home_remedy", _node("home_remedy", home_remedy_agent, ahome_remedy_agent))
+    graph.add_node("physical_relief", _node("physical_relief", physical_relief_agent, aphysical_relief_agent))
+    info_search_agent = build_info_search_agent()
+    graph.add_node("info_search", _node("info_search", info_search_agent.invoke, info_search_agent.ainvoke))
+    graph.add_node("general_medical", _node("general_medical", general_medical_agent, ageneral_medical_agent))
+
+    graph.add_node("memory_reader", _node("memory_reader", memory_reader_agent, amemory_reader_agent))
+    graph.add_node("final_summary", _node(
+        "final_summary", final_summary_agent, afinal_summary_agent, fallback=fallback_summary, reserve=0.0,
+    ))
 
     # workflow
     graph.set_entry_point("init_outputs")
-    graph.add_edge("init_outputs", "extract_symptoms")
-    graph.add_edge("extract_symptoms", "emergency_alert")
+
+    if triage_mode == "combined":
+        graph.add_edge("init_outputs", "triage")
+        graph.add_edge("triage", "emergency_alert")
+    else:
+        # The three LLM calls only need the raw message: fan out, then join
+        pre_routing = ["extract_symptoms", "emergency_classifier", "intent_classifier"]
+        for node in pre_routing:
+            graph.add_edge("init_outputs", node)
+        graph.add_edge(pre_routing, "emergency_alert")
     graph.add_edge("emergency_alert", "handle_db")
-    graph.add_edge("handle_db", "intent_classifier")
 
     # Conditional branching 
     graph.add_conditional_edges(
-        "intent_classifier",
+        "handle_db",
         route_from_intent,
         {
             "home_remedy": "home_remedy",
@@ -93,10 +140,9 @@ def build_healthbot_workflow():
     graph.add_edge("info_search", "memory_reader")
     graph.add_edge("general_medical", "memory_reader")
 
-    # Final summary + store to memory
+    # Final summary
     graph.add_edge("memory_reader", "final_summary")
-    graph.add_edge("final_summary", "memory_writer")
-    graph.add_edge("memory_writer", END)
+    graph.add_edge("final_summary", END)
 
     print("# Graph ready to compile")
 